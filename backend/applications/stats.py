@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.db.models import Count
+
+from config import cache_generations
+from .models import Application
+
+
+def compute_application_stats(user_id):
+    """A user's applications by status, from one GROUP BY."""
+    by_status = dict.fromkeys((s for s, _ in Application.STATUS_CHOICES), 0)
+    rows = Application.objects.filter(user_id=user_id).order_by().values_list('status').annotate(n=Count('id'))
+    for status, n in rows:
+        by_status[status] = by_status.get(status, 0) + n
+    return {'total': sum(by_status.values()), 'by_status': by_status}
+
+
+def _namespace(user_id):
+    return f'applications:stats:{user_id}'
+
+
+def get_application_stats(user_id):
+    return cache_generations.get_or_set(
+        _namespace(user_id), 'by_status', lambda: compute_application_stats(user_id),
+        timeout=settings.STATS_CACHE_SECONDS,
+    )
+
+
+def invalidate_application_stats(user_id):
+    cache_generations.invalidate(_namespace(user_id))
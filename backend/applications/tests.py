@@ -1,3 +1,34 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, override_settings
 
-# Create your tests here.
+from accounts.models import User
+from opportunities.models import Opportunity
+from .models import Application
+from .stats import get_application_stats
+
+
+# Counts database queries for the stats themselves, not the cache backend's
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ApplicationStatsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='a@example.edu', username='a', password='x' * 12)
+        for status in ['saved', 'saved', 'submitted']:
+            opportunity = Opportunity.objects.create(title='Opportunity', university='MIT', url='https://example.edu/')
+            Application.objects.create(user=self.user, opportunity=opportunity, status=status)
+
+    def test_counts_by_status_in_one_query_until_an_application_changes(self):
+        with self.assertNumQueries(1):
+            stats = get_application_stats(self.user.id)
+        self.assertEqual(stats['total'], 3)
+        self.assertEqual(stats['by_status']['saved'], 2)
+        self.assertEqual(stats['by_status']['accepted'], 0)
+        with self.assertNumQueries(0):
+            get_application_stats(self.user.id)
+
+        application = Application.objects.get(status='submitted')
+        application.status = 'accepted'
+        with self.captureOnCommitCallbacks(execute=True):
+            application.save()
+        stats = get_application_stats(self.user.id)
+        self.assertEqual((stats['by_status']['submitted'], stats['by_status']['accepted']), (0, 1))
@@ -4,6 +4,7 @@ from rest_framework.response import Response
 from django.utils import timezone
 from .models import Application, AutoFillProfile
 from .serializers import ApplicationSerializer, AutoFillProfileSerializer
+from .stats import get_application_stats
 
 
 class ApplicationListCreateView(generics.ListCreateAPIView):
@@ -45,11 +46,4 @@ class AutoFillProfileView(generics.RetrieveUpdateAPIView):
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def application_stats(request):
-    apps = Application.objects.filter(user=request.user)
-    stats = {
-        'total': apps.count(),
-        'by_status': {}
-    }
-    for status, _ in Application.STATUS_CHOICES:
-        stats['by_status'][status] = apps.filter(status=status).count()
-    return Response(stats)
+    return Response(get_application_stats(request.user.id))
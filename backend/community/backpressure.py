@@ -0,0 +1,104 @@
+"""
+Flow control for chat connections: a token bucket per connection for what
+clients send, a bounded queue per connection for what they're sent, and
+per-room counters over the live connections of this process.
+
+Counters are in memory and only cover the connections this process serves,
+so with several ASGI workers each reports its own share; `pid` in
+chat_metrics() tells them apart.
+"""
+import asyncio
+import json
+import os
+import time
+import weakref
+from collections import deque
+
+
+class TokenBucket:
+    """Allows `rate` actions a second on average and bursts of up to `burst`."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class OutboundQueue:
+    """
+    Frames waiting to be written to one client, at most `maxsize`. When a
+    slow reader lets it fill up, the oldest frames are dropped and the
+    client gets one {'type': 'dropped', 'count': n} frame in their place,
+    so it knows to reload history.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.frames = deque()
+        self.dropped = 0  # since the client was last told
+        self.dropped_total = 0
+        self._ready = asyncio.Event()
+
+    def __len__(self):
+        return len(self.frames)
+
+    def put(self, frame):
+        if len(self.frames) >= self.maxsize:
+            self.frames.popleft()
+            self.dropped += 1
+            self.dropped_total += 1
+        self.frames.append(frame)
+        self._ready.set()
+
+    async def get(self):
+        while not self.frames:
+            self._ready.clear()
+            await self._ready.wait()
+        if self.dropped:
+            count, self.dropped = self.dropped, 0
+            return json.dumps({'type': 'dropped', 'count': count})
+        return self.frames.popleft()
+
+
+_connections = weakref.WeakSet()
+
+
+def track(consumer):
+    _connections.add(consumer)
+
+
+def untrack(consumer):
+    _connections.discard(consumer)
+
+
+def chat_metrics():
+    """
+    Per-room connection counts, queue depths and rejected frames (rate
+    limited, oversized, binary, invalid JSON) for this process only.
+    """
+    rooms = {}
+    for consumer in list(_connections):
+        room = rooms.setdefault(consumer.room_slug, {
+            'connections': 0, 'queued': 0, 'max_queued': 0, 'dropped': 0,
+            'rate_limited': 0, 'oversized': 0, 'binary': 0, 'invalid': 0,
+        })
+        depth = len(consumer.outbound)
+        room['connections'] += 1
+        room['queued'] += depth
+        room['max_queued'] = max(room['max_queued'], depth)
+        room['dropped'] += consumer.outbound.dropped_total
+        room['rate_limited'] += consumer.rate_limited
+        room['oversized'] += consumer.oversized
+        room['binary'] += consumer.binary
+        room['invalid'] += consumer.invalid
+    return {'pid': os.getpid(), 'connections': sum(room['connections'] for room in rooms.values()), 'rooms': rooms}
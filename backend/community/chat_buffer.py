@@ -0,0 +1,69 @@
+"""
+Write-behind persistence for chat messages.
+
+Saving each message with its own database_sync_to_async call queues one
+hop per message on the database thread, which backs up during busy
+sessions. With CHAT_WRITE_BEHIND on, consumers hand messages to the buffer
+of their event loop instead, and it saves them with one bulk_create when
+CHAT_FLUSH_MAX_MESSAGES are waiting or CHAT_FLUSH_MS after the first one,
+whichever comes first. Each sender still gets its saved message, id and
+timestamp included, before it broadcasts.
+"""
+import asyncio
+import weakref
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+
+from .models import ChatMessage
+
+
+class ChatMessageBuffer:
+    def __init__(self, flush_ms, max_messages):
+        self.flush_ms = flush_ms
+        self.max_messages = max_messages
+        self._pending = []  # (unsaved ChatMessage, future for the sender)
+        self._timer = None
+        self._writes = set()  # running flushes, so they aren't garbage collected
+
+    async def save(self, room_id, author_id, content):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((ChatMessage(room_id=room_id, author_id=author_id, content=content), future))
+        if len(self._pending) >= self.max_messages:
+            self.flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.flush_ms / 1000, self.flush)
+        return await future
+
+    def flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            write = asyncio.ensure_future(self._write(batch))
+            self._writes.add(write)
+            write.add_done_callback(self._writes.discard)
+
+    async def _write(self, batch):
+        try:
+            await database_sync_to_async(ChatMessage.objects.bulk_create)([message for message, _ in batch])
+        except Exception as exc:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+        else:
+            for message, future in batch:
+                if not future.done():
+                    future.set_result(message)
+
+
+_buffers = weakref.WeakKeyDictionary()  # event loop -> its buffer
+
+
+def message_buffer():
+    loop = asyncio.get_running_loop()
+    if loop not in _buffers:
+        _buffers[loop] = ChatMessageBuffer(settings.CHAT_FLUSH_MS, settings.CHAT_FLUSH_MAX_MESSAGES)
+    return _buffers[loop]
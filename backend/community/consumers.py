@@ -1,15 +1,35 @@
+import asyncio
 import json
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
+from django.conf import settings
 from django.contrib.auth import get_user_model
 
+from .backpressure import OutboundQueue, TokenBucket, track, untrack
+
 User = get_user_model()
 
 
+def chat_frame(msg, user):
+    """The websocket frame every member of the room receives for `msg`."""
+    return json.dumps({
+        'type': 'message',
+        'message': msg.content,
+        'user': user.email,
+        'username': user.username,
+        'timestamp': msg.created_at.isoformat(),
+        'msg_id': msg.id,
+    })
+
+
 class ChatConsumer(AsyncWebsocketConsumer):
     async def connect(self):
         self.room_slug = self.scope['url_route']['kwargs']['room_slug']
         self.room_group_name = f'chat_{self.room_slug}'
+        self.room_id = await self.get_room_id()
+        if self.room_id is None:
+            await self.close()  # before accept(), this rejects the handshake
+            return
 
         await self.channel_layer.group_add(
             self.room_group_name,
@@ -20,44 +40,90 @@ class ChatConsumer(AsyncWebsocketConsumer):
             'type': 'system',
             'message': f'Connected to {self.room_slug}'
         }))
+        self.bucket = TokenBucket(settings.CHAT_RATE_LIMIT, settings.CHAT_RATE_BURST)
+        self.rate_limited = self.oversized = self.binary = self.invalid = 0
+        self.open_outbound()
+        track(self)
+
+    def open_outbound(self, maxsize=None):
+        """Everything sent from here on goes through a bounded queue and a writer task."""
+        self.outbound = OutboundQueue(maxsize or settings.CHAT_OUTBOUND_QUEUE)
+        self.writer = asyncio.ensure_future(self.write_outbound())
+
+    async def write_outbound(self):
+        while True:
+            await self.send(text_data=await self.outbound.get())
 
     async def disconnect(self, close_code):
+        if getattr(self, 'room_id', None) is None:
+            return
+        untrack(self)
+        if getattr(self, 'writer', None) is not None:
+            self.writer.cancel()
         await self.channel_layer.group_discard(
             self.room_group_name,
             self.channel_name
         )
 
-    async def receive(self, text_data):
-        data = json.loads(text_data)
-        message = data.get('message', '')
+    async def receive(self, text_data=None, bytes_data=None):
+        if text_data is None:
+            self.binary += 1
+            self.reject('Binary frames are not supported')
+            return
+        if len(text_data) > settings.CHAT_MAX_MESSAGE_LENGTH:
+            self.oversized += 1
+            self.reject('Message too long')
+            return
+        if not self.bucket.take():
+            self.rate_limited += 1
+            self.reject('Slow down')
+            return
+        try:
+            data = json.loads(text_data)
+        except ValueError:
+            self.invalid += 1
+            self.reject('Invalid message')
+            return
+        message = data.get('message', '') if isinstance(data, dict) else ''
         user = self.scope['user']
 
-        if user.is_authenticated and message.strip():
+        if user.is_authenticated and isinstance(message, str) and message.strip():
             msg = await self.save_message(user, message)
+            # Serialized once here rather than by every listener's consumer
             await self.channel_layer.group_send(
                 self.room_group_name,
                 {
                     'type': 'chat_message',
-                    'message': message,
-                    'user': user.email,
-                    'username': user.username,
-                    'timestamp': msg.created_at.isoformat(),
-                    'msg_id': msg.id,
+                    'text': chat_frame(msg, user),
                 }
             )
 
+    def reject(self, reason):
+        self.outbound.put(json.dumps({'type': 'error', 'message': reason}))
+
+    async def dispatch(self, message):
+        # Broadcasts are forwarded without touching the database, so skip the
+        # close_old_connections() thread hop Channels makes before every handler
+        if message['type'] == 'chat_message':
+            await self.chat_message(message)
+        else:
+            await super().dispatch(message)
+
     async def chat_message(self, event):
-        await self.send(text_data=json.dumps({
-            'type': 'message',
-            'message': event['message'],
-            'user': event['user'],
-            'username': event['username'],
-            'timestamp': event['timestamp'],
-            'msg_id': event['msg_id'],
-        }))
+        self.outbound.put(event['text'])
+
+    @database_sync_to_async
+    def get_room_id(self):
+        from community.models import ChatRoom
+        return ChatRoom.objects.filter(slug=self.room_slug).values_list('id', flat=True).first()
+
+    async def save_message(self, user, content):
+        if settings.CHAT_WRITE_BEHIND:
+            from community.chat_buffer import message_buffer
+            return await message_buffer().save(self.room_id, user.id, content)
+        return await self.create_message(user, content)
 
     @database_sync_to_async
-    def save_message(self, user, content):
-        from community.models import ChatRoom, ChatMessage
-        room = ChatRoom.objects.get(slug=self.room_slug)
-        return ChatMessage.objects.create(room=room, author=user, content=content)
+    def create_message(self, user, content):
+        from community.models import ChatMessage
+        return ChatMessage.objects.create(room_id=self.room_id, author=user, content=content)
@@ -0,0 +1,34 @@
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Post
+
+
+def _count_per_post(model):
+    counted = model.objects.filter(post=OuterRef('pk')).order_by().values('post').annotate(n=Count('pk')).values('n')
+    return Coalesce(Subquery(counted, output_field=IntegerField()), 0)
+
+
+def reconcile_post_counters(dry_run=False):
+    """
+    Recount likes and comments for every post and repair the stored
+    counters that drifted. Returns the drifted rows as (id, likes_count,
+    actual likes, comments_count, actual comments).
+    """
+    drifted = list(
+        Post.objects.annotate(
+            actual_likes=_count_per_post(Post.likes.through),
+            actual_comments=_count_per_post(Comment),
+        ).filter(
+            ~Q(likes_count=F('actual_likes')) | ~Q(comments_count=F('actual_comments'))
+        ).order_by('id').values_list('id', 'likes_count', 'actual_likes', 'comments_count', 'actual_comments')
+    )
+    if drifted and not dry_run:
+        with transaction.atomic():
+            # Recount in the UPDATE itself rather than writing the values read above
+            Post.objects.filter(id__in=[row[0] for row in drifted]).update(
+                likes_count=_count_per_post(Post.likes.through),
+                comments_count=_count_per_post(Comment),
+            )
+    return drifted
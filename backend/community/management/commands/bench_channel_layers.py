@@ -0,0 +1,115 @@
+import asyncio
+import multiprocessing
+import statistics
+import tempfile
+import time
+
+from channels import layers
+from django.core.management.base import BaseCommand
+
+from config.channel_layers import InMemoryChannelLayer, SQLiteChannelLayer
+
+
+GROUP = 'chat_bench'
+
+
+async def listen(layer, listeners, messages, ready=None):
+    """Join `listeners` channels to the group and collect send-to-receive latencies."""
+    channels = [await layer.new_channel() for _ in range(listeners)]
+    for channel in channels:
+        await layer.group_add(GROUP, channel)
+    if ready is not None:
+        ready.set()
+    latencies = []
+
+    async def receive_all(channel):
+        for _ in range(messages):
+            message = await layer.receive(channel)
+            latencies.append(time.time() - message['sent'])
+
+    await asyncio.gather(*(receive_all(channel) for channel in channels))
+    return latencies, time.time()
+
+
+async def send(layer, messages, rate):
+    """Send `messages` to the group, as fast as possible or at `rate` per second."""
+    for _ in range(messages):
+        await layer.group_send(GROUP, {'type': 'chat_message', 'text': 'x' * 200, 'sent': time.time()})
+        await asyncio.sleep(1 / rate if rate else 0)
+
+
+def worker(path, listeners, messages, ready, results):
+    async def main():
+        layer = SQLiteChannelLayer(path, capacity=messages + 1)
+        result = await listen(layer, listeners, messages, ready)
+        await layer.close()
+        return result
+
+    results.put(asyncio.run(main()))
+
+
+class Command(BaseCommand):
+    help = ('Benchmark chat fan-out throughput and latency: in one process on Channels\' in-memory '
+            'layer, ours and the SQLite layer, then across worker processes on the SQLite layer.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--listeners', type=int, default=100, help='Channels in the group per process.')
+        parser.add_argument('--processes', type=int, nargs='+', default=[1, 2, 4])
+        parser.add_argument('--messages', type=int, default=500)
+        parser.add_argument('--rate', type=int, default=200, help='Messages/sec for the latency runs.')
+
+    def handle(self, *args, **options):
+        listeners, messages, rate = options['listeners'], options['messages'], options['rate']
+        self.stdout.write(f'{"layer":<24}{"burst msg/s":>12}{"deliveries/s":>14}{"p50":>10}{"p99":>10}'
+                          f'   (latency at {rate} msg/s)')
+        with tempfile.TemporaryDirectory() as directory:
+            in_process = [
+                ('channels in-memory', lambda: layers.InMemoryChannelLayer(capacity=messages + 1)),
+                ('in-memory', lambda: InMemoryChannelLayer(capacity=messages + 1)),
+                ('sqlite, 1 process', lambda: SQLiteChannelLayer(f'{directory}/local.sqlite3', capacity=messages + 1)),
+            ]
+            for name, make_layer in in_process:
+                burst = asyncio.run(self.in_process(make_layer(), listeners, messages, 0))
+                paced = asyncio.run(self.in_process(make_layer(), listeners, messages, rate))
+                self.report(name, listeners, burst, paced)
+            for count in options['processes']:
+                path = f'{directory}/shared-{count}.sqlite3'
+                burst = self.across_processes(path, count, listeners, messages, 0)
+                paced = self.across_processes(path, count, listeners, messages, rate)
+                self.report(f'sqlite, {count} worker(s)', count * listeners, burst, paced)
+
+    def report(self, name, listeners, burst, paced):
+        (_, rate), (latencies, _) = burst, paced
+        p50, p99 = (statistics.quantiles(latencies, n=100)[i] * 1000 for i in (49, 98))
+        self.stdout.write(f'{name:<24}{rate:>12.0f}{rate * listeners:>14.0f}{p50:>8.2f}ms{p99:>8.2f}ms')
+
+    async def in_process(self, layer, listeners, messages, rate):
+        listening = asyncio.ensure_future(listen(layer, listeners, messages))
+        await asyncio.sleep(0.05)  # let the listeners join
+        start = time.time()
+        await send(layer, messages, rate)
+        latencies, finished = await listening
+        await layer.close()
+        return latencies, messages / (finished - start)
+
+    def across_processes(self, path, count, listeners, messages, rate):
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        readies = [context.Event() for _ in range(count)]
+        workers = [context.Process(target=worker, args=(path, listeners, messages, ready, results))
+                   for ready in readies]
+        for process in workers:
+            process.start()
+        for ready in readies:
+            ready.wait()
+
+        start = time.time()
+        asyncio.run(send(SQLiteChannelLayer(path), messages, rate))
+        outcomes = [results.get() for _ in workers]
+        for process in workers:
+            process.join()
+        latencies = [latency for worker_latencies, _ in outcomes for latency in worker_latencies]
+        finished = max(finished for _, finished in outcomes)
+        # Start over for the next run
+        SQLiteChannelLayer(path)._connection().execute('DELETE FROM channel_groups')
+        return latencies, messages / (finished - start)
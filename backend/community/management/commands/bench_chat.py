@@ -0,0 +1,109 @@
+import asyncio
+import json
+import time
+
+from channels import layers
+from channels.generic.websocket import AsyncWebsocketConsumer
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from accounts.models import User
+from config.channel_layers import InMemoryChannelLayer
+from community.consumers import ChatConsumer, chat_frame
+from community.models import ChatMessage
+
+
+class LegacyChatConsumer(ChatConsumer):
+    """
+    ChatConsumer as it was: every listener rebuilds and serializes the frame,
+    after a database thread hop.
+    """
+    dispatch = AsyncWebsocketConsumer.dispatch
+
+    async def chat_message(self, event):
+        await self.send(text_data=json.dumps({
+            'type': 'message',
+            'message': event['message'],
+            'user': event['user'],
+            'username': event['username'],
+            'timestamp': event['timestamp'],
+            'msg_id': event['msg_id'],
+        }))
+
+
+def legacy_event(msg, user):
+    return {
+        'type': 'chat_message',
+        'message': msg.content,
+        'user': user.email,
+        'username': user.username,
+        'timestamp': msg.created_at.isoformat(),
+        'msg_id': msg.id,
+    }
+
+
+def frame_event(msg, user):
+    return {'type': 'chat_message', 'text': chat_frame(msg, user)}
+
+
+class Command(BaseCommand):
+    help = ('Benchmark chat fan-out through an in-process channel layer: messages/sec by room size, '
+            'serializing once per listener (as before) and once per message, on Channels\' '
+            'in-memory layer and on ours. No database access.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1, 10, 100, 500])
+        parser.add_argument('--messages', type=int, default=200)
+        parser.add_argument('--length', type=int, default=200, help='Characters per message.')
+
+    def handle(self, *args, **options):
+        user = User(id=1, email='bench@bench.invalid', username='bench')
+        runs = [
+            ('per listener', layers.InMemoryChannelLayer, LegacyChatConsumer, legacy_event),
+            ('pre-serialized', layers.InMemoryChannelLayer, ChatConsumer, frame_event),
+            ('+ sweep throttle', InMemoryChannelLayer, ChatConsumer, frame_event),
+        ]
+        self.stdout.write(f'{"listeners":>9}' + ''.join(f'{name:>20}' for name, *_ in runs) + f'{"speedup":>9}')
+        for size in options['sizes']:
+            rates = [
+                asyncio.run(self.fan_out(layer(capacity=options['messages'] + 1), consumer, event, size,
+                                         options['messages'], options['length'], user))
+                for _, layer, consumer, event in runs
+            ]
+            self.stdout.write(
+                f'{size:>9}' + ''.join(f'{rate:>14.0f} msg/s' for rate in rates) + f'{rates[-1] / rates[0]:>8.1f}x'
+            )
+
+    async def fan_out(self, layer, consumer_class, make_event, size, messages, length, user):
+        """Messages/sec sent to a room of `size` consumers, until every one has sent them all on."""
+        delivered = 0
+
+        async def sink(message):
+            nonlocal delivered
+            delivered += 1
+
+        async def listen(consumer):
+            for _ in range(messages):
+                await consumer.dispatch(await layer.receive(consumer.channel_name))
+
+        consumers = []
+        for _ in range(size):
+            consumer = consumer_class()
+            consumer.channel_layer, consumer.base_send = layer, sink
+            consumer.channel_name = await layer.new_channel()
+            await layer.group_add('chat_bench', consumer.channel_name)
+            consumer.open_outbound(maxsize=messages)
+            consumers.append(consumer)
+
+        start = time.perf_counter()
+        listeners = [asyncio.ensure_future(listen(consumer)) for consumer in consumers]
+        for i in range(messages):
+            msg = ChatMessage(id=i + 1, content='x' * length, created_at=timezone.now())
+            await layer.group_send('chat_bench', make_event(msg, user))
+        await asyncio.gather(*listeners)
+        while delivered < size * messages:  # let the writers empty the outbound queues
+            await asyncio.sleep(0)
+        elapsed = time.perf_counter() - start
+        for consumer in consumers:
+            consumer.writer.cancel()
+        return messages / elapsed
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from community.counters import reconcile_post_counters
+
+
+class Command(BaseCommand):
+    help = 'Recount post likes and comments and repair denormalized counters that drifted.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report drift without fixing it.')
+
+    def handle(self, *args, **options):
+        drifted = reconcile_post_counters(dry_run=options['dry_run'])
+        for post_id, likes, actual_likes, comments, actual_comments in drifted:
+            self.stdout.write(
+                f'post {post_id}: likes {likes} -> {actual_likes}, comments {comments} -> {actual_comments}'
+            )
+        verb = 'Found' if options['dry_run'] else 'Repaired'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {len(drifted)} posts with drifted counters'))
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.30 on 2026-10-18 07:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("community", "0002_post_counters"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="chatmessage",
+            index=models.Index(
+                fields=["room", "created_at", "id"],
+                name="community_c_room_id_a4e99d_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                fields=["created_at", "id"], name="community_p_created_2df112_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,143 @@
+# Full-text index for posts, kept in sync by triggers (see config/search.py)
+
+from django.db import migrations
+
+SQLITE_FORWARDS = [
+    """
+    CREATE VIRTUAL TABLE community_post_search USING fts5(
+        title, content, username,
+        tokenize = 'porter unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    """,
+    """
+    INSERT INTO community_post_search(community_post_search, rank)
+    VALUES ('rank', 'bm25(10.0, 1.0, 2.0)')
+    """,
+    """
+    INSERT INTO community_post_search(rowid, title, content, username)
+    SELECT p.id, p.title, p.content, u.username
+    FROM community_post p JOIN accounts_user u ON u.id = p.author_id
+    """,
+    """
+    CREATE TRIGGER community_post_search_insert
+    AFTER INSERT ON community_post BEGIN
+        INSERT INTO community_post_search(rowid, title, content, username)
+        VALUES (new.id, new.title, new.content,
+                (SELECT username FROM accounts_user WHERE id = new.author_id));
+    END
+    """,
+    """
+    CREATE TRIGGER community_post_search_update
+    AFTER UPDATE OF title, content, author_id ON community_post BEGIN
+        UPDATE community_post_search
+        SET title = new.title, content = new.content,
+            username = (SELECT username FROM accounts_user WHERE id = new.author_id)
+        WHERE rowid = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER community_post_search_delete
+    AFTER DELETE ON community_post BEGIN
+        DELETE FROM community_post_search WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER community_post_search_username
+    AFTER UPDATE OF username ON accounts_user BEGIN
+        UPDATE community_post_search SET username = new.username
+        WHERE rowid IN (SELECT id FROM community_post WHERE author_id = new.id);
+    END
+    """,
+]
+
+SQLITE_BACKWARDS = [
+    "DROP TRIGGER community_post_search_insert",
+    "DROP TRIGGER community_post_search_update",
+    "DROP TRIGGER community_post_search_delete",
+    "DROP TRIGGER community_post_search_username",
+    "DROP TABLE community_post_search",
+]
+
+POSTGRES_DOCUMENT = """
+    setweight(to_tsvector('english', coalesce({row}.title, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(
+        (SELECT username FROM accounts_user WHERE id = {row}.author_id), ''
+    )), 'B') ||
+    setweight(to_tsvector('english', coalesce({row}.content, '')), 'D')
+"""
+
+POSTGRES_FORWARDS = [
+    """
+    CREATE TABLE community_post_search (
+        id bigint PRIMARY KEY REFERENCES community_post (id) ON DELETE CASCADE,
+        document tsvector NOT NULL
+    )
+    """,
+    "CREATE INDEX community_post_search_gin ON community_post_search USING GIN (document)",
+    f"""
+    INSERT INTO community_post_search (id, document)
+    SELECT p.id, {POSTGRES_DOCUMENT.format(row='p')} FROM community_post p
+    """,
+    f"""
+    CREATE FUNCTION community_post_search_sync() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO community_post_search (id, document)
+        VALUES (NEW.id, {POSTGRES_DOCUMENT.format(row='NEW')})
+        ON CONFLICT (id) DO UPDATE SET document = EXCLUDED.document;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER community_post_search_sync
+    AFTER INSERT OR UPDATE OF title, content, author_id ON community_post
+    FOR EACH ROW EXECUTE FUNCTION community_post_search_sync()
+    """,
+    # Re-index a renamed user's posts by touching them, which fires the trigger above
+    """
+    CREATE FUNCTION community_post_search_username() RETURNS trigger AS $$
+    BEGIN
+        UPDATE community_post SET author_id = author_id WHERE author_id = NEW.id;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER community_post_search_username
+    AFTER UPDATE OF username ON accounts_user
+    FOR EACH ROW WHEN (OLD.username IS DISTINCT FROM NEW.username)
+    EXECUTE FUNCTION community_post_search_username()
+    """,
+]
+
+POSTGRES_BACKWARDS = [
+    "DROP TRIGGER community_post_search_username ON accounts_user",
+    "DROP FUNCTION community_post_search_username()",
+    "DROP TRIGGER community_post_search_sync ON community_post",
+    "DROP FUNCTION community_post_search_sync()",
+    "DROP TABLE community_post_search",
+]
+
+
+def run(statements):
+    def operation(apps, schema_editor):
+        for sql in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql, params=None)
+
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0001_initial"),
+        ("community", "0003_keyset_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run({"sqlite": SQLITE_FORWARDS, "postgresql": POSTGRES_FORWARDS}),
+            run({"sqlite": SQLITE_BACKWARDS, "postgresql": POSTGRES_BACKWARDS}),
+        ),
+    ]
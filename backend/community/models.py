@@ -18,20 +18,17 @@ class Post(models.Model):
     tags = models.JSONField(default=list)
     likes = models.ManyToManyField(User, related_name='liked_posts', blank=True)
     views_count = models.IntegerField(default=0)
+    # Denormalized; kept in step by toggle_post_like and comment signals,
+    # repaired by the reconcile_post_counters command
+    likes_count = models.PositiveIntegerField(default=0)
+    comments_count = models.PositiveIntegerField(default=0)
     is_pinned = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-created_at']
-
-    @property
-    def likes_count(self):
-        return self.likes.count()
-
-    @property
-    def comments_count(self):
-        return self.comments.count()
+        indexes = [models.Index(fields=['created_at', 'id'])]  # keyset pagination
 
     def __str__(self):
         return self.title
@@ -78,6 +75,7 @@ class ChatMessage(models.Model):
 
     class Meta:
         ordering = ['created_at']
+        indexes = [models.Index(fields=['room', 'created_at', 'id'])]  # keyset pagination
 
     def __str__(self):
         return f"{self.author.email}: {self.content[:50]}"
@@ -14,9 +14,10 @@ class CommentSerializer(serializers.ModelSerializer):
         read_only_fields = ['author', 'likes']
 
     def get_replies(self, obj):
-        if obj.parent is None:
-            return CommentSerializer(obj.replies.all(), many=True).data
-        return []
+        # Threads are linked in memory by build_comment_tree; a comment
+        # serialized on its own (e.g. just created) has no replies yet
+        replies = getattr(obj, 'thread_replies', [])
+        return CommentSerializer(replies, many=True, context=self.context).data
 
     def create(self, validated_data):
         validated_data['author'] = self.context['request'].user
@@ -25,8 +26,6 @@ class CommentSerializer(serializers.ModelSerializer):
 
 class PostSerializer(serializers.ModelSerializer):
     author = UserSerializer(read_only=True)
-    likes_count = serializers.ReadOnlyField()
-    comments_count = serializers.ReadOnlyField()
     is_liked = serializers.SerializerMethodField()
 
     class Meta:
@@ -37,6 +36,10 @@ class PostSerializer(serializers.ModelSerializer):
         read_only_fields = ['author', 'views_count', 'likes_count', 'comments_count']
 
     def get_is_liked(self, obj):
+        # Views annotate the flag (see posts_for); this fallback covers
+        # instances that didn't come from there, e.g. a just-created post
+        if hasattr(obj, 'is_liked'):
+            return obj.is_liked
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return obj.likes.filter(id=request.user.id).exists()
@@ -1,3 +1,355 @@
+import asyncio
+import sqlite3
+import tempfile
+
+from asgiref.sync import async_to_sync
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from config.channel_layers import InMemoryChannelLayer, SQLiteChannelLayer
+from config.view_counts import view_counter
+from .backpressure import OutboundQueue, chat_metrics
+from .chat_buffer import ChatMessageBuffer
+from .counters import reconcile_post_counters
+from .models import ChatMessage, ChatRoom, Comment, Post
+from .routing import websocket_urlpatterns
+from .threads import build_comment_tree
+
+
+class PostCounterTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='a@example.edu', username='a', password='x' * 12)
+        self.post = Post.objects.create(author=self.user, title='Hello', content='...')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_like_toggle_and_comments_keep_counters(self):
+        url = f'/api/community/posts/{self.post.id}/like/'
+        self.assertEqual(self.client.post(url).data, {'liked': True, 'likes_count': 1})
+        self.assertEqual(self.client.post(url).data, {'liked': False, 'likes_count': 0})
+
+        comment = Comment.objects.create(post=self.post, author=self.user, content='...')
+        Comment.objects.create(post=self.post, author=self.user, content='...', parent=comment)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 2)
+        comment.delete()  # cascades to the reply
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+
+    def test_reconcile_repairs_drift(self):
+        self.post.likes.add(self.user)
+        Post.objects.filter(id=self.post.id).update(comments_count=3)
+        self.assertEqual(reconcile_post_counters(), [(self.post.id, 0, 1, 3, 0)])
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.likes_count, self.post.comments_count), (1, 0))
+        self.assertEqual(reconcile_post_counters(), [])
+
+
+class PostListQueryTests(TestCase):
+    def test_list_and_detail_resolve_is_liked_in_the_page_query(self):
+        user = User.objects.create_user(email='a@example.edu', username='a', password='x' * 12)
+        posts = [Post.objects.create(author=user, title=f'Post {i}', content='...') for i in range(5)]
+        posts[1].likes.add(user)
+        client = APIClient()
+        client.force_authenticate(user)
+
+        with self.assertNumQueries(1):  # keyset pagination needs no COUNT
+            results = client.get('/api/community/posts/').data['results']
+        self.assertEqual([p['id'] for p in results if p['is_liked']], [posts[1].id])
+
+        with self.settings(VIEW_COUNT_FLUSH_SECONDS=3600), self.assertNumQueries(1):  # the view is buffered
+            self.assertTrue(client.get(f'/api/community/posts/{posts[1].id}/').data['is_liked'])
+        self.assertEqual(view_counter.flush(), 1)
+
+        anonymous = APIClient().get('/api/community/posts/').data['results']
+        self.assertFalse(any(p['is_liked'] for p in anonymous))
+
+
+class CommentThreadTests(TestCase):
+    def test_whole_thread_in_constant_queries_with_depth_cap(self):
+        user = User.objects.create_user(email='a@example.edu', username='a', password='x' * 12)
+        post = Post.objects.create(author=user, title='Hello', content='...')
+        parent = None
+        for depth in range(8):  # one chain, eight levels deep
+            parent = Comment.objects.create(post=post, author=user, content=f'level {depth}', parent=parent)
+        Comment.objects.create(post=post, author=user, content='second thread')
+
+        with self.assertNumQueries(2):  # comments with authors + their likes
+            results = APIClient().get(f'/api/community/posts/{post.id}/comments/').data['results']
+        self.assertEqual([c['content'] for c in results], ['level 0', 'second thread'])
+
+        node = results[0]
+        for _ in range(4):
+            (node,) = node['replies']
+        self.assertEqual(node['content'], 'level 4')
+        self.assertEqual([c['content'] for c in node['replies']], ['level 5', 'level 6', 'level 7'])
+        self.assertFalse(any(c['replies'] for c in node['replies']))
+
+    def test_build_comment_tree_flattens_below_the_cap(self):
+        user = User.objects.create_user(email='a@example.edu', username='a', password='x' * 12)
+        post = Post.objects.create(author=user, title='Hello', content='...')
+        root = Comment.objects.create(post=post, author=user, content='root')
+        child = Comment.objects.create(post=post, author=user, content='child', parent=root)
+        Comment.objects.create(post=post, author=user, content='grandchild', parent=child)
+
+        (tree,) = build_comment_tree(Comment.objects.all(), max_depth=1)
+        self.assertEqual([c.content for c in tree.thread_replies], ['child', 'grandchild'])
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='a@example.edu', username='a', password='x' * 12)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_posts_page_by_cursor_without_count(self):
+        posts = [Post.objects.create(author=self.user, title=f'Post {i}', content='...') for i in range(5)]
+        newest_first = [p.id for p in reversed(posts)]
+
+        with self.assertNumQueries(1):
+            page = self.client.get('/api/community/posts/?page_size=2').data
+        self.assertEqual([p['id'] for p in page['results']], newest_first[:2])
+        self.assertIsNone(page['previous'])
+
+        Post.objects.create(author=self.user, title='Newer', content='...')  # doesn't shift later pages
+        page = self.client.get(page['next']).data
+        self.assertEqual([p['id'] for p in page['results']], newest_first[2:4])
+        last = self.client.get(page['next']).data
+        self.assertEqual([p['id'] for p in last['results']], newest_first[4:])
+        self.assertIsNone(last['next'])
+
+        back = self.client.get(last['previous']).data
+        self.assertEqual([p['id'] for p in back['results']], newest_first[2:4])
+
+        by_views = self.client.get('/api/community/posts/?ordering=-views_count').data
+        self.assertEqual(by_views['count'], 6)
+
+    def test_chat_history_loads_older_messages(self):
+        room = ChatRoom.objects.create(name='General', slug='general')
+        messages = [ChatMessage.objects.create(room=room, author=self.user, content=str(i)) for i in range(60)]
+
+        page = self.client.get('/api/community/chat/general/history/').data
+        self.assertEqual(len(page['results']), 50)
+        self.assertEqual(page['results'][0]['id'], messages[-1].id)
+        older = self.client.get(page['next']).data
+        self.assertEqual([m['id'] for m in older['results']], [m.id for m in reversed(messages[:10])])
+        self.assertIsNone(older['next'])
+
+        self.assertEqual(self.client.get('/api/community/chat/general/history/?cursor=bogus').status_code, 404)
+
+
+class PostSearchTests(TestCase):
+    def test_matches_title_content_and_author_username(self):
+        alice = User.objects.create_user(email='alice@example.edu', username='alice', password='x' * 12)
+        Post.objects.create(author=alice, title='Applying for fellowships', content='Tips')
+        Post.objects.create(author=alice, title='Lab life', content='My first fellowship interview')
+
+        def search(query):
+            return [p['title'] for p in APIClient().get('/api/community/posts/', {'search': query}).data['results']]
+
+        self.assertEqual(search('fellowship'), ['Applying for fellowships', 'Lab life'])
+        alice.username = 'wanderer'
+        alice.save()
+        self.assertEqual(len(search('wande')), 2)
+        self.assertEqual(search('alice'), [])
+
+
+class ChatConsumerTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='a@example.edu', username='a', password='x' * 12)
+        self.room = ChatRoom.objects.create(name='Study group', slug='study-group')
+
+    def communicator(self, slug):
+        communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), f'/ws/chat/{slug}/')
+        communicator.scope['user'] = self.user
+        return communicator
+
+    async def chat(self, slug, messages):
+        communicator = self.communicator(slug)
+        connected, _ = await communicator.connect()
+        received = []
+        if connected:
+            await communicator.receive_json_from()  # the welcome
+            for message in messages:
+                await communicator.send_json_to({'message': message})
+                received.append(await communicator.receive_json_from())
+        await communicator.disconnect()
+        return connected, received
+
+    async def test_unknown_rooms_are_rejected(self):
+        connected, _ = await self.chat('no-such-room', [])
+        self.assertFalse(connected)
+
+    async def test_messages_are_saved_and_broadcast(self):
+        for write_behind in (False, True):
+            with self.settings(CHAT_WRITE_BEHIND=write_behind):
+                connected, received = await self.chat('study-group', [f'hello {write_behind}'])
+            self.assertTrue(connected)
+            saved = await ChatMessage.objects.aget(content=f'hello {write_behind}')
+            self.assertEqual(saved.room_id, self.room.id)
+            self.assertEqual(received[0]['msg_id'], saved.id)
+
+    async def test_oversized_and_too_frequent_messages_are_rejected(self):
+        with self.settings(CHAT_MAX_MESSAGE_LENGTH=100, CHAT_RATE_LIMIT=0.01, CHAT_RATE_BURST=2):
+            communicator = self.communicator('study-group')
+            await communicator.connect()
+            await communicator.receive_json_from()
+            replies = []
+            for frame in [{'bytes_data': b'{}'}, {'text_data': 'x' * 200}, {'text_data': '{"message":'},
+                          {'text_data': '{"message": "one"}'}, {'text_data': '{"message": "two"}'}]:
+                await communicator.send_to(**frame)
+                replies.append(await communicator.receive_json_from())
+            metrics = chat_metrics()
+            await communicator.disconnect()
+        self.assertEqual([r.get('message') for r in replies],
+                         ['Binary frames are not supported', 'Message too long', 'Invalid message', 'one', 'Slow down'])
+        self.assertEqual(metrics['rooms']['study-group'],
+                         {'connections': 1, 'queued': 0, 'max_queued': 0, 'dropped': 0,
+                          'rate_limited': 1, 'oversized': 1, 'binary': 1, 'invalid': 1})
+        self.assertEqual(chat_metrics()['connections'], 0)
+
+    def test_full_outbound_queue_drops_oldest_frames_and_says_so(self):
+        async def drain():
+            queue = OutboundQueue(maxsize=2)
+            for frame in ['1', '2', '3', '4']:
+                queue.put(frame)
+            return [await queue.get() for _ in range(3)], queue.dropped_total
+
+        frames, dropped = async_to_sync(drain)()
+        self.assertEqual(frames, ['{"type": "dropped", "count": 2}', '3', '4'])
+        self.assertEqual(dropped, 2)
+
+    def test_buffer_saves_a_batch_per_flush(self):
+        buffer = ChatMessageBuffer(flush_ms=1, max_messages=3)
+
+        async def send():
+            return await asyncio.gather(*(buffer.save(self.room.id, self.user.id, str(i)) for i in range(4)))
+
+        with self.assertNumQueries(2):  # a full batch of 3, then the last one on the timer
+            saved = async_to_sync(send)()
+        self.assertEqual([m.content for m in saved], ['0', '1', '2', '3'])
+        self.assertTrue(all(m.pk and m.created_at for m in saved))
+
+
+class InMemoryChannelLayerTests(TestCase):
+    async def test_expired_messages_are_swept_at_most_once_per_interval(self):
+        layer = InMemoryChannelLayer(expiry=0)
+        layer.sweep_interval = 60
+        stale, live = await layer.new_channel(), await layer.new_channel()
+        for channel in (stale, live):
+            await layer.group_add('chat_room', channel)
+        await layer.send(stale, {'type': 'chat_message', 'text': 'expired'})
+
+        # The sweep drops the expired message and, as in Channels, its channel's memberships
+        await layer.group_send('chat_room', {'type': 'chat_message', 'text': 'hi'})
+        self.assertEqual(list(layer.groups['chat_room']), [live])
+        self.assertNotIn(stale, layer.channels)
+        self.assertEqual((await layer.receive(live))['text'], 'hi')
+
+        # Within sweep_interval nothing is swept, so a message that has already expired is delivered
+        await layer.send(live, {'type': 'chat_message', 'text': 'late'})
+        await layer.group_send('chat_room', {'type': 'chat_message', 'text': 'again'})
+        self.assertEqual([(await layer.receive(live))['text'] for _ in range(2)], ['late', 'again'])
+
+    async def test_group_memberships_expire_and_empty_groups_are_removed(self):
+        layer = InMemoryChannelLayer(group_expiry=60)
+        old, new = await layer.new_channel(), await layer.new_channel()
+        for channel in (old, new):
+            await layer.group_add('chat_room', channel)
+        layer.groups['chat_room'][old] -= 120  # joined two minutes ago
+
+        await layer.group_send('chat_room', {'type': 'chat_message', 'text': 'hi'})
+        self.assertEqual(list(layer.groups['chat_room']), [new])
+        self.assertNotIn(old, layer.channels)
+
+        await layer.group_discard('chat_room', new)
+        self.assertNotIn('chat_room', layer.groups)
+
+
+class SQLiteChannelLayerTests(TestCase):
+    """Two layers on one database stand in for two worker processes."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = f'{directory.name}/channels.sqlite3'
+
+    async def test_groups_span_processes(self):
+        one, two = SQLiteChannelLayer(self.path), SQLiteChannelLayer(self.path)
+        here, there = await one.new_channel(), await two.new_channel()
+        for layer, channel in ((one, here), (two, there)):
+            await layer.group_add('chat_room', channel)
+        await one.group_send('chat_room', {'type': 'chat_message', 'text': 'hi'})
+        await one.send(there, {'type': 'chat_message', 'text': 'direct'})
+
+        self.assertEqual((await one.receive(here))['text'], 'hi')
+        received = [await asyncio.wait_for(two.receive(there), 1) for _ in range(2)]
+        self.assertEqual([m['text'] for m in received], ['hi', 'direct'])
+
+        await two.group_discard('chat_room', there)
+        await one.group_send('chat_room', {'type': 'chat_message', 'text': 'bye'})
+        with self.assertRaises(asyncio.TimeoutError):
+            await asyncio.wait_for(two.receive(there), 0.05)
+        for layer in (one, two):
+            await layer.close()
+
+    async def test_shared_channels_deliver_each_message_once(self):
+        one, two = SQLiteChannelLayer(self.path), SQLiteChannelLayer(self.path)
+        for i in range(3):
+            await one.send('scrape', {'type': 'job', 'n': i, 'payload': b'\x00'})
+        received = [await two.receive('scrape'), await one.receive('scrape'), await two.receive('scrape')]
+        self.assertEqual([m['n'] for m in received], [0, 1, 2])
+        self.assertEqual(received[0]['payload'], b'\x00')
+
+    async def test_messages_from_another_loop_in_the_same_process_arrive(self):
+        layer = SQLiteChannelLayer(self.path)
+        channel = await layer.new_channel()
+        await layer.group_add('chat_room', channel)
+        receiving = asyncio.ensure_future(layer.receive(channel))
+        await asyncio.sleep(0.01)  # the receiver's loop is now the poller's
+
+        # As from a view or a Celery task, on a thread with its own event loop
+        send = async_to_sync(layer.send)
+        group_send = async_to_sync(layer.group_send)
+        await asyncio.to_thread(group_send, 'chat_room', {'type': 'chat_message', 'text': 'from a task'})
+        self.assertEqual((await asyncio.wait_for(receiving, 1))['text'], 'from a task')
+        await asyncio.to_thread(send, channel, {'type': 'chat_message', 'text': 'direct'})
+        self.assertEqual((await asyncio.wait_for(layer.receive(channel), 1))['text'], 'direct')
+        await layer.close()
+
+    async def test_database_waits_do_not_block_the_event_loop(self):
+        layer = SQLiteChannelLayer(self.path)
+        channel = await layer.new_channel()
+        blocker = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        self.addCleanup(blocker.close)
+        blocker.execute('BEGIN IMMEDIATE')
+        joining = asyncio.ensure_future(layer.group_add('chat_room', channel))
+        ticks = 0
+        while not joining.done() and ticks < 10:
+            await asyncio.sleep(0.01)
+            ticks += 1
+        self.assertEqual(ticks, 10)  # the loop ran on while the insert waited for the write lock
+        blocker.execute('COMMIT')
+        await joining
+        await layer.close()
+
+    async def test_memberships_of_dead_processes_are_purged(self):
+        dead, alive = SQLiteChannelLayer(self.path), SQLiteChannelLayer(self.path)
+        await dead.group_add('chat_room', await dead.new_channel())
+        here = await alive.new_channel()
+        await alive.group_add('chat_room', here)
+        await alive.send(await dead.new_channel(), {'type': 'chat_message', 'text': 'lost'})
+
+        connection = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        self.addCleanup(connection.close)
+        connection.execute('UPDATE channel_processes SET seen = 0 WHERE prefix = ?', (dead.client_prefix,))
+        await alive._run(alive._check, None)  # a poll tick that's due to sweep
 
-# Create your tests here.
+        self.assertEqual(connection.execute('SELECT channel FROM channel_groups').fetchall(), [(here,)])
+        self.assertEqual(connection.execute('SELECT COUNT(*) FROM channel_messages').fetchone(), (0,))
+        self.assertEqual(connection.execute('SELECT prefix FROM channel_processes').fetchall(),
+                         [(alive.client_prefix,)])
+        await alive.close()
@@ -0,0 +1,35 @@
+MAX_THREAD_DEPTH = 5
+
+
+def build_comment_tree(comments, max_depth=MAX_THREAD_DEPTH):
+    """
+    Link a post's comments into threads in O(n), without further queries.
+    Each comment gets a `thread_replies` list, oldest first. Replies nested
+    deeper than `max_depth` are attached to their ancestor at that depth,
+    so no comment is dropped. Returns the top-level comments.
+    """
+    comments = sorted(comments, key=lambda c: (c.created_at, c.id))
+    by_id = {c.id: c for c in comments}
+    roots = []
+    for comment in comments:
+        comment.thread_replies = []
+    for comment in comments:
+        parent = by_id.get(comment.parent_id)
+        if parent is None:
+            roots.append(comment)
+        else:
+            parent.thread_replies.append(comment)
+
+    # Pull replies below the cap up to their capped ancestor, breadth first
+    level = roots
+    for _ in range(max_depth - 1):
+        level = [reply for comment in level for reply in comment.thread_replies]
+    for comment in level:
+        stack, flattened = list(comment.thread_replies), []
+        while stack:
+            reply = stack.pop()
+            flattened.append(reply)
+            stack.extend(reply.thread_replies)
+            reply.thread_replies = []
+        comment.thread_replies = sorted(flattened, key=lambda c: (c.created_at, c.id))
+    return roots
@@ -7,5 +7,6 @@ urlpatterns = [
     path('posts/<int:pk>/like/', views.toggle_post_like, name='post-like'),
     path('posts/<int:post_pk>/comments/', views.CommentListCreateView.as_view(), name='post-comments'),
     path('chat/rooms/', views.ChatRoomListView.as_view(), name='chat-rooms'),
+    path('chat/metrics/', views.chat_metrics_view, name='chat-metrics'),
     path('chat/<slug:slug>/history/', views.ChatMessageHistoryView.as_view(), name='chat-history'),
 ]
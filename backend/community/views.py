@@ -1,20 +1,39 @@
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Value
+from django.shortcuts import get_object_or_404
 from rest_framework import generics, permissions, filters
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
+
+from config.pagination import ChatHistoryPagination, KeysetPagination
+from config.search import FullTextSearchFilter
+from config.view_counts import view_counter
+from .backpressure import chat_metrics
 from .models import Post, Comment, ChatRoom, ChatMessage
 from .serializers import PostSerializer, CommentSerializer, ChatRoomSerializer, ChatMessageSerializer
+from .threads import build_comment_tree
+
+
+def posts_for(user):
+    """Posts with author and profile joined and is_liked for `user` resolved in the same query."""
+    if user.is_authenticated:
+        is_liked = Exists(Post.likes.through.objects.filter(post=OuterRef('pk'), user=user))
+    else:
+        is_liked = Value(False)
+    return Post.objects.select_related('author', 'author__profile').annotate(is_liked=is_liked)
 
 
 class PostListCreateView(generics.ListCreateAPIView):
     serializer_class = PostSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    pagination_class = KeysetPagination
+    filter_backends = [filters.OrderingFilter, FullTextSearchFilter]
     search_fields = ['title', 'content', 'author__username']
     ordering_fields = ['created_at', 'views_count']
     ordering = ['-created_at']
 
     def get_queryset(self):
-        qs = Post.objects.all().select_related('author')
+        qs = posts_for(self.request.user)
         category = self.request.query_params.get('category')
         if category:
             qs = qs.filter(category=category)
@@ -24,7 +43,9 @@ class PostListCreateView(generics.ListCreateAPIView):
 class PostDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = PostSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
-    queryset = Post.objects.all().select_related('author')
+
+    def get_queryset(self):
+        return posts_for(self.request.user)
 
     def get_permissions(self):
         if self.request.method in ['PUT', 'PATCH', 'DELETE']:
@@ -33,22 +54,26 @@ class PostDetailView(generics.RetrieveUpdateDestroyAPIView):
 
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
-        instance.views_count += 1
-        instance.save(update_fields=['views_count'])
+        view_counter.increment(instance)
         return Response(PostSerializer(instance, context={'request': request}).data)
 
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def toggle_post_like(request, pk):
-    post = Post.objects.get(pk=pk)
-    user = request.user
-    if post.likes.filter(id=user.id).exists():
-        post.likes.remove(user)
-        liked = False
-    else:
-        post.likes.add(user)
-        liked = True
+    post = get_object_or_404(Post, pk=pk)
+    Like = Post.likes.through
+    with transaction.atomic():
+        removed, _ = Like.objects.filter(post=post, user=request.user).delete()
+        if removed:
+            liked, delta = False, -removed
+        else:
+            # get_or_create, so a concurrent like of the same post counts once
+            _, created = Like.objects.get_or_create(post=post, user=request.user)
+            liked, delta = True, int(created)
+        if delta:
+            Post.objects.filter(pk=post.pk).update(likes_count=F('likes_count') + delta)
+    post.refresh_from_db(fields=['likes_count'])
     return Response({'liked': liked, 'likes_count': post.likes_count})
 
 
@@ -58,7 +83,16 @@ class CommentListCreateView(generics.ListCreateAPIView):
 
     def get_queryset(self):
         post_id = self.kwargs.get('post_pk')
-        return Comment.objects.filter(post_id=post_id, parent=None).select_related('author')
+        return (Comment.objects.filter(post_id=post_id)
+                .select_related('author', 'author__profile').prefetch_related('likes'))
+
+    def list(self, request, *args, **kwargs):
+        # The whole thread in one query, then top-level comments paginated in memory
+        threads = build_comment_tree(self.get_queryset())
+        page = self.paginate_queryset(threads)
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        return Response(self.get_serializer(threads, many=True).data)
 
 
 class ChatRoomListView(generics.ListCreateAPIView):
@@ -70,9 +104,21 @@ class ChatRoomListView(generics.ListCreateAPIView):
 class ChatMessageHistoryView(generics.ListAPIView):
     serializer_class = ChatMessageSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = ChatHistoryPagination
 
     def get_queryset(self):
         room_slug = self.kwargs['slug']
         return ChatMessage.objects.filter(
             room__slug=room_slug
-        ).select_related('author').order_by('-created_at')[:50]
+        ).select_related('author', 'author__profile')
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def chat_metrics_view(request):
+    """
+    Live chat connections, outbound queue depths and rejected frames by
+    room. Only for the worker process that serves this request: with
+    several ASGI workers, each reports its own connections.
+    """
+    return Response(chat_metrics())
@@ -0,0 +1,27 @@
+"""
+Cached values invalidated by moving a generation token on, rather than by
+deleting their key.
+
+Deleting the key when a write commits races with a reader that computed
+the value before the commit but stores it after, which would leave stale
+data cached until it expires. Here a reader stores under the generation it
+read before computing, and invalidate() switches readers to a fresh
+random generation, so a late store lands where nobody looks.
+"""
+import secrets
+
+from django.core.cache import cache
+
+
+def _token():
+    return secrets.token_hex(8)
+
+
+def get_or_set(namespace, key, default, timeout):
+    """cache.get_or_set() for `key` under the current generation of `namespace`."""
+    generation = cache.get_or_set(f'{namespace}:generation', _token, timeout=None)
+    return cache.get_or_set(f'{namespace}:{generation}:{key}', default, timeout=timeout)
+
+
+def invalidate(namespace):
+    cache.set(f'{namespace}:generation', _token(), timeout=None)
@@ -0,0 +1,370 @@
+"""
+Channel layers for chat.
+
+Channels' InMemoryChannelLayer sweeps every channel and group for expired
+messages on each receive(), and group_send() starts a task per member, so
+delivering one message to a room of N listeners costs O(N²). Messages only
+expire after a minute (`expiry`), so sweeping at most once a second changes
+nothing a client can notice and, with members filled in directly, keeps
+fan-out linear.
+
+SQLiteChannelLayer shares groups between the ASGI processes of one host
+through a SQLite database in WAL mode, so chat can run on several Daphne
+workers without Redis.
+"""
+import asyncio
+import json
+import secrets
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
+
+import msgpack
+from channels import layers
+from channels.exceptions import ChannelFull
+
+
+class InMemoryChannelLayer(layers.InMemoryChannelLayer):
+    sweep_interval = 1.0  # seconds between expiry sweeps
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._next_sweep = 0.0
+
+    def _clean_expired(self):
+        now = time.monotonic()
+        if now < self._next_sweep:
+            return
+        self._next_sweep = now + self.sweep_interval
+        super()._clean_expired()
+
+    async def send(self, channel, message):
+        assert isinstance(message, dict), 'message is not a dict'
+        self.require_valid_channel_name(channel)
+        assert '__asgi_channel__' not in message
+        self._put(channel, message)
+
+    async def group_send(self, group, message):
+        assert isinstance(message, dict), 'Message is not a dict'
+        self.require_valid_group_name(group)
+        self._clean_expired()
+        for channel in list(self.groups.get(group, ())):
+            try:
+                self._put(channel, message)
+            except ChannelFull:
+                pass
+
+    def _put(self, channel, message, expires=None):
+        queue = self.channels.get(channel)
+        if queue is None:
+            queue = self.channels[channel] = asyncio.Queue(maxsize=self.get_capacity(channel))
+        try:
+            queue.put_nowait((expires or time.time() + self.expiry, deepcopy(message)))
+        except asyncio.QueueFull:
+            raise ChannelFull(channel)
+
+
+SCHEMA_VERSION = 2  # PRAGMA user_version; older tables are dropped and recreated
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS channel_messages (
+        id INTEGER PRIMARY KEY,
+        target TEXT NOT NULL,
+        channels TEXT,
+        expires REAL NOT NULL,
+        body BLOB NOT NULL
+    )
+    """,
+    'CREATE INDEX IF NOT EXISTS channel_messages_target ON channel_messages (target, id)',
+    """
+    CREATE TABLE IF NOT EXISTS channel_groups (
+        grp TEXT NOT NULL,
+        channel TEXT NOT NULL,
+        process TEXT,
+        joined REAL NOT NULL,
+        PRIMARY KEY (grp, channel)
+    ) WITHOUT ROWID
+    """,
+    'CREATE INDEX IF NOT EXISTS channel_groups_channel ON channel_groups (channel)',
+    'CREATE INDEX IF NOT EXISTS channel_groups_process ON channel_groups (process)',
+    """
+    CREATE TABLE IF NOT EXISTS channel_processes (
+        prefix TEXT PRIMARY KEY,
+        seen REAL NOT NULL
+    ) WITHOUT ROWID
+    """,
+]
+
+
+class SQLiteChannelLayer(InMemoryChannelLayer):
+    """
+    Each process gets a random prefix for the channels it creates, and
+    messages for those channels are queued in memory as in
+    InMemoryChannelLayer. Messages for another process's channels become
+    one row addressed to that process, carrying the list of its channels
+    they're for, so a group_send writes a row per process rather than per
+    member. Every process polls `PRAGMA data_version`, which changes only
+    when another connection commits, and claims its rows with a single
+    DELETE ... RETURNING when it does. Polls start `poll_interval` seconds
+    apart and back off to `max_poll_interval` while nothing arrives.
+
+    Messages for this process's own channels never go through the
+    database: on the loop that receives them they're queued directly, and
+    from any other loop or thread (async_to_sync in a view or Celery task)
+    they're handed to that loop with call_soon_threadsafe(). A row this
+    process inserted itself wouldn't change data_version for it.
+
+    Group membership lives in the database. Channels without a '!' are
+    shared by all processes: each message goes to the first receive() that
+    claims it, polled for with the same backoff.
+
+    All database work runs on one thread of the layer's own, never on the
+    event loop, since a write can wait up to `timeout` seconds for the
+    lock. Each process records a heartbeat every `db_sweep_interval`
+    seconds; memberships and queued messages of a process that hasn't
+    been seen for `process_expiry` seconds (it crashed or was killed) are
+    purged by the others rather than kept until `group_expiry`.
+
+    Capacity is only enforced on arrival: a full channel in another process
+    drops the message instead of raising ChannelFull in the sender.
+    """
+    db_sweep_interval = 10.0  # seconds between heartbeats and purges
+    process_expiry = 60.0  # seconds without a heartbeat before a process is presumed dead
+
+    def __init__(self, path, poll_interval=0.002, max_poll_interval=0.05, **kwargs):
+        super().__init__(**kwargs)
+        self.path = str(path)
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.client_prefix = f'p{secrets.token_hex(6)}'
+        self._local = threading.local()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='channel-layer')
+        self._poller = None
+        self._poller_loop = None
+        self._next_db_sweep = 0.0
+        connection = self._connection()
+        connection.execute('PRAGMA journal_mode = WAL')
+        if connection.execute('PRAGMA user_version').fetchone()[0] < SCHEMA_VERSION:
+            for table in ('channel_messages', 'channel_groups', 'channel_processes'):
+                connection.execute(f'DROP TABLE IF EXISTS {table}')
+            connection.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+        for statement in SCHEMA:
+            connection.execute(statement)
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            # Autocommit: every statement here is its own transaction
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            connection.execute('PRAGMA synchronous = NORMAL')
+            self._local.connection = connection
+        return connection
+
+    async def _run(self, function, *args):
+        """Run a database call on the layer's thread."""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+
+    def _execute(self, sql, params=()):
+        return self._connection().execute(sql, params).fetchall()
+
+    # Addressing
+
+    async def new_channel(self, prefix='specific.'):
+        return f'{prefix}.{self.client_prefix}!{secrets.token_hex(8)}'
+
+    @staticmethod
+    def _target(channel):
+        """The process a specific channel belongs to, or the shared channel itself."""
+        if '!' in channel:
+            return channel.split('!', 1)[0].rsplit('.', 1)[-1]
+        return f'channel:{channel}'
+
+    def _put_local(self, channel, message):
+        """
+        Queue a message for one of this process's channels, handing it to
+        the receiving loop if we're on another one. Returns False when no
+        loop is receiving, in which case it's stored for the poller to
+        claim once one starts.
+        """
+        loop = self._poller_loop
+        if loop is None or loop is asyncio.get_running_loop():
+            self._put(channel, message)
+            return True
+        if not loop.is_running():
+            return False
+        loop.call_soon_threadsafe(self._put_quietly, channel, deepcopy(message))
+        return True
+
+    def _put_quietly(self, channel, message, expires=None):
+        try:
+            self._put(channel, message, expires)
+        except ChannelFull:
+            pass
+
+    def _pack(self, message):
+        return msgpack.packb(message, use_bin_type=True)
+
+    def _insert(self, rows):
+        self._connection().executemany(
+            'INSERT INTO channel_messages (target, channels, expires, body) VALUES (?, ?, ?, ?)', rows
+        )
+
+    # Channel layer API
+
+    async def send(self, channel, message):
+        assert isinstance(message, dict), 'message is not a dict'
+        self.require_valid_channel_name(channel)
+        assert '__asgi_channel__' not in message
+        if self._target(channel) != self.client_prefix or not self._put_local(channel, message):
+            await self._run(self._insert, [(self._target(channel), json.dumps([channel]),
+                                            time.time() + self.expiry, self._pack(message))])
+
+    async def receive(self, channel):
+        self.require_valid_channel_name(channel)
+        if '!' in channel:
+            self._ensure_poller()
+            return await super().receive(channel)
+        delay = self.poll_interval
+        while True:
+            rows = await self._run(
+                self._execute,
+                'DELETE FROM channel_messages WHERE id = ('
+                '    SELECT id FROM channel_messages WHERE target = ? AND expires >= ? ORDER BY id LIMIT 1'
+                ') RETURNING body',
+                (self._target(channel), time.time()),
+            )
+            if rows:
+                return msgpack.unpackb(rows[0][0], raw=False)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_poll_interval)
+
+    async def group_add(self, group, channel):
+        self.require_valid_group_name(group)
+        self.require_valid_channel_name(channel)
+        await self._run(self._join, group, channel)
+
+    def _join(self, group, channel):
+        now = time.time()
+        process = self._target(channel) if '!' in channel else None
+        connection = self._connection()
+        if process == self.client_prefix:
+            # Members need a heartbeat to outlive group_expiry, even before the poller starts
+            connection.execute('INSERT OR REPLACE INTO channel_processes (prefix, seen) VALUES (?, ?)',
+                               (process, now))
+        connection.execute(
+            'INSERT OR REPLACE INTO channel_groups (grp, channel, process, joined) VALUES (?, ?, ?, ?)',
+            (group, channel, process, now),
+        )
+
+    async def group_discard(self, group, channel):
+        self.require_valid_channel_name(channel)
+        self.require_valid_group_name(group)
+        await self._run(self._execute, 'DELETE FROM channel_groups WHERE grp = ? AND channel = ?', (group, channel))
+
+    async def group_send(self, group, message):
+        assert isinstance(message, dict), 'Message is not a dict'
+        self.require_valid_group_name(group)
+        self._clean_expired()
+        members = await self._run(
+            self._execute,
+            'SELECT channel FROM channel_groups WHERE grp = ? AND joined > ?',
+            (group, time.time() - self.group_expiry),
+        )
+        remote = defaultdict(list)
+        for (channel,) in members:
+            target = self._target(channel)
+            if target == self.client_prefix:
+                try:
+                    if self._put_local(channel, message):
+                        continue
+                except ChannelFull:
+                    continue
+            remote[target].append(channel)
+        if remote:
+            expires, body = time.time() + self.expiry, self._pack(message)
+            await self._run(self._insert, [(target, json.dumps(channels), expires, body)
+                                           for target, channels in remote.items()])
+
+    async def flush(self):
+        await self._run(self._flush)
+        await super().flush()
+
+    def _flush(self):
+        connection = self._connection()
+        for table in ('channel_messages', 'channel_groups', 'channel_processes'):
+            connection.execute(f'DELETE FROM {table}')
+
+    async def close(self):
+        if self._poller is not None:
+            self._poller.cancel()
+            self._poller = self._poller_loop = None
+        await self._run(self._leave)
+
+    def _leave(self):
+        connection = self._connection()
+        connection.execute('DELETE FROM channel_groups WHERE process = ?', (self.client_prefix,))
+        connection.execute('DELETE FROM channel_processes WHERE prefix = ?', (self.client_prefix,))
+
+    # Delivery from other processes
+
+    def _ensure_poller(self):
+        loop = asyncio.get_running_loop()
+        if self._poller is None or self._poller.done() or self._poller_loop is not loop:
+            self._poller_loop = loop
+            self._poller = loop.create_task(self._poll())
+
+    async def _poll(self):
+        version = None
+        delay = self.poll_interval
+        while True:
+            version, rows = await self._run(self._check, version)
+            now = time.time()
+            for channels, expires, body in rows:
+                if expires < now:
+                    continue
+                message = msgpack.unpackb(body, raw=False)
+                for channel in json.loads(channels):
+                    self._put_quietly(channel, message, expires)
+            # Poll quickly while messages are arriving, less and less often while idle
+            delay = self.poll_interval if rows else min(delay * 2, self.max_poll_interval)
+            await asyncio.sleep(delay)
+
+    def _check(self, version):
+        """
+        On the layer's thread: claim this process's rows if another
+        connection has committed since `version`, and heartbeat and purge
+        when due. Returns the new version and the claimed rows, oldest first.
+        """
+        connection = self._connection()
+        current = connection.execute('PRAGMA data_version').fetchone()[0]
+        rows = []
+        if current != version:
+            rows = connection.execute(
+                'DELETE FROM channel_messages WHERE target = ? RETURNING id, channels, expires, body',
+                (self.client_prefix,),
+            ).fetchall()
+        if time.monotonic() >= self._next_db_sweep:
+            self._next_db_sweep = time.monotonic() + self.db_sweep_interval
+            self._sweep(connection)
+        return current, [row[1:] for row in sorted(rows)]
+
+    def _sweep(self, connection):
+        now = time.time()
+        connection.execute('INSERT OR REPLACE INTO channel_processes (prefix, seen) VALUES (?, ?)',
+                           (self.client_prefix, now))
+        dead = [prefix for (prefix,) in connection.execute(
+            'SELECT prefix FROM channel_processes WHERE seen < ?', (now - self.process_expiry,)
+        )]
+        for prefix in dead:
+            connection.execute('DELETE FROM channel_groups WHERE process = ?', (prefix,))
+            connection.execute('DELETE FROM channel_messages WHERE target = ?', (prefix,))
+            connection.execute('DELETE FROM channel_processes WHERE prefix = ?', (prefix,))
+        connection.execute('DELETE FROM channel_messages WHERE expires < ?', (now,))
+        connection.execute('DELETE FROM channel_groups WHERE joined < ?', (now - self.group_expiry,))
+
+    def _remove_from_groups(self, channel):
+        # Called from the synchronous expiry sweep; the delete needn't be awaited
+        self._executor.submit(self._execute, 'DELETE FROM channel_groups WHERE channel = ?', (channel,))
@@ -0,0 +1,123 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination on (created_at, id) for feeds that grow at the head.
+
+    Each page is a range scan after the last row seen, so there is no OFFSET
+    or COUNT(*) and inserts never shift later pages. `next` goes to older
+    rows and `previous` to newer ones (the other way round for
+    ?ordering=created_at). Requests that sort by any other field with
+    OrderingFilter, or by relevance with ?search=, fall back to page numbers.
+    """
+    field = 'created_at'
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        ordering = request.query_params.get(api_settings.ORDERING_PARAM, '').strip()
+        searching = request.query_params.get(api_settings.SEARCH_PARAM, '').strip()
+        if searching or ordering not in ('', self.field, f'-{self.field}'):
+            self.fallback = PageNumberPagination()
+            return self.fallback.paginate_queryset(queryset, request, view)
+        self.fallback = None
+        self.descending = ordering != self.field
+        page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+
+        # Walking towards newer rows on a descending feed scans ascending, and vice versa
+        reverse = cursor is not None and cursor[2]
+        ascending = self.descending == reverse
+        prefix = '' if ascending else '-'
+        queryset = queryset.order_by(f'{prefix}{self.field}', f'{prefix}id')
+        if cursor is not None:
+            value, pk, _ = cursor
+            op = 'gt' if ascending else 'lt'
+            queryset = queryset.filter(
+                Q(**{f'{self.field}__{op}': value}) | Q(**{self.field: value, f'id__{op}': pk})
+            )
+
+        rows = list(queryset[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+        self.page = rows
+        self.has_next = has_more if not reverse else bool(rows)
+        self.has_previous = cursor is not None and (has_more if reverse else bool(rows))
+        return rows
+
+    def get_paginated_response(self, data):
+        if self.fallback is not None:
+            return self.fallback.get_paginated_response(data)
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def encode_cursor(self, row, reverse):
+        position = {'v': getattr(row, self.field).isoformat(), 'id': row.pk}
+        if reverse:
+            position['r'] = 1
+        token = base64.urlsafe_b64encode(json.dumps(position, separators=(',', ':')).encode()).decode()
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, token.rstrip('='))
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+            return datetime.fromisoformat(position['v']), int(position['id']), bool(position.get('r'))
+        except (binascii.Error, ValueError, KeyError, TypeError):
+            raise NotFound(self.invalid_cursor_message)
+
+
+class ChatHistoryPagination(KeysetPagination):
+    """Newest messages first; `next` loads older history."""
+    page_size = 50
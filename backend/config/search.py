@@ -0,0 +1,90 @@
+"""
+Full-text search over per-model side tables named `<db_table>_search`.
+
+The tables are created and kept in sync by database triggers in each app's
+migrations: an FTS5 virtual table (rowid = object id) on SQLite, and a
+tsvector column with a GIN index on PostgreSQL. Other engines fall back to
+DRF's icontains SearchFilter.
+"""
+import re
+
+from django.db import connection
+from django.db.models import FloatField
+from django.db.models.expressions import RawSQL
+from rest_framework import filters
+from rest_framework.settings import api_settings
+
+
+SEARCH_CONFIG = 'english'  # PostgreSQL text search configuration
+_TERM_RE = re.compile(r'(\w+)(\*?)')
+
+
+def search_table(model):
+    return f'{model._meta.db_table}_search'
+
+
+def parse_terms(query):
+    """
+    Words of a user query as (word, is_prefix). A trailing '*' asks for a
+    prefix match, and so does the last word, for search-as-you-type.
+    """
+    terms = [(word.lower(), bool(star)) for word, star in _TERM_RE.findall(query)]
+    if terms:
+        terms[-1] = (terms[-1][0], True)
+    return terms
+
+
+def _match_expression(terms, vendor):
+    if vendor == 'sqlite':
+        return ' '.join(f'"{word}"' + ('*' if prefix else '') for word, prefix in terms)
+    return ' & '.join(word + (':*' if prefix else '') for word, prefix in terms)
+
+
+def supports_full_text(vendor=None):
+    return (vendor or connection.vendor) in ('sqlite', 'postgresql')
+
+
+def full_text_search(queryset, query):
+    """
+    Restrict `queryset` to objects matching every word of `query` and
+    annotate `search_rank`, where lower is more relevant on every engine.
+    """
+    terms = parse_terms(query)
+    if not terms:
+        return queryset
+    table = search_table(queryset.model)
+    base = queryset.model._meta.db_table
+    match = _match_expression(terms, connection.vendor)
+    if connection.vendor == 'sqlite':
+        ids = f'SELECT rowid FROM {table} WHERE {table} MATCH %s'
+        # Ranks are read from the matches materialized once (LIMIT stops SQLite
+        # flattening them into the lookup); running MATCH again for every row
+        # took seconds on 40k matches
+        rank = (f'SELECT rank FROM (SELECT rowid, rank FROM {table} WHERE {table} MATCH %s LIMIT -1) '
+                f'AS matches WHERE matches.rowid = {base}.id')
+    else:
+        tsquery = f"to_tsquery('{SEARCH_CONFIG}', %s)"
+        ids = f'SELECT id FROM {table} WHERE document @@ {tsquery}'
+        rank = f'SELECT -ts_rank(document, {tsquery}) FROM {table} WHERE {table}.id = {base}.id'
+    return queryset.filter(pk__in=RawSQL(ids, [match])).annotate(
+        search_rank=RawSQL(rank, [match], output_field=FloatField())
+    )
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+    """
+    ?search= backed by the full-text index and ordered by relevance, unless
+    the client asked for an explicit ?ordering=. List it after
+    OrderingFilter so the relevance order isn't overridden.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        if not supports_full_text():
+            return super().filter_queryset(request, queryset, view)
+        query = request.query_params.get(self.search_param, '')
+        if not parse_terms(query):
+            return queryset
+        queryset = full_text_search(queryset, query)
+        if request.query_params.get(api_settings.ORDERING_PARAM):
+            return queryset
+        return queryset.order_by('search_rank', '-id')
@@ -68,9 +68,15 @@ TEMPLATES = [
 
 ASGI_APPLICATION = 'config.asgi.application'
 
+# Set to a file path to share chat groups between ASGI worker processes on one host
+CHANNEL_LAYER_DB = config('CHANNEL_LAYER_DB', default='')
+
 CHANNEL_LAYERS = {
     'default': {
-        'BACKEND': 'channels.layers.InMemoryChannelLayer',
+        'BACKEND': 'config.channel_layers.SQLiteChannelLayer',
+        'CONFIG': {'path': CHANNEL_LAYER_DB},
+    } if CHANNEL_LAYER_DB else {
+        'BACKEND': 'config.channel_layers.InMemoryChannelLayer',
     },
 }
 
@@ -143,8 +149,67 @@ CORS_ALLOWED_ORIGINS = [
 ]
 CORS_ALLOW_CREDENTIALS = True
 
+# Cache
+# Shared by every web and Celery process, so that coalescing keys and cache
+# invalidations made in one are seen by the others. Redis when CACHE_URL is
+# set, otherwise a database table (create it with manage.py createcachetable).
+CACHE_URL = config('CACHE_URL', default='')
+if CACHE_URL:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': CACHE_URL}}
+else:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'cache_table'}}
+
 # Celery
 CELERY_BROKER_URL = config('REDIS_URL', default='redis://localhost:6379/0')
 CELERY_RESULT_BACKEND = config('REDIS_URL', default='redis://localhost:6379/0')
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
+
+# Scraping
+SCRAPER_MAX_WORKERS = config('SCRAPER_MAX_WORKERS', default=16, cast=int)
+SCRAPER_PER_HOST_LIMIT = config('SCRAPER_PER_HOST_LIMIT', default=4, cast=int)
+SCRAPER_TIMEOUT = config('SCRAPER_TIMEOUT', default=30, cast=int)
+SCRAPER_STREAMING = config('SCRAPER_STREAMING', default=True, cast=bool)
+
+# InCoScore
+LEADERBOARD_COALESCE_SECONDS = config('LEADERBOARD_COALESCE_SECONDS', default=5, cast=int)
+SCORE_RECALC_SECONDS = config('SCORE_RECALC_SECONDS', default=30, cast=int)
+SCORE_RECALC_BATCH_SIZE = config('SCORE_RECALC_BATCH_SIZE', default=500, cast=int)
+LEADERBOARD_REBUILD_SECONDS = config('LEADERBOARD_REBUILD_SECONDS', default=3600, cast=int)
+
+# Recommendations
+RECOMMENDATION_REFRESH_SECONDS = config('RECOMMENDATION_REFRESH_SECONDS', default=60, cast=int)
+
+# Dashboard stats
+STATS_CACHE_SECONDS = config('STATS_CACHE_SECONDS', default=300, cast=int)
+
+# View counters (see config/view_counts.py)
+VIEW_COUNT_FLUSH_SECONDS = config('VIEW_COUNT_FLUSH_SECONDS', default=10, cast=int)
+VIEW_COUNT_MAX_STALENESS = config('VIEW_COUNT_MAX_STALENESS', default=60, cast=int)
+
+# Chat (see community/chat_buffer.py and community/backpressure.py)
+CHAT_WRITE_BEHIND = config('CHAT_WRITE_BEHIND', default=False, cast=bool)
+CHAT_FLUSH_MS = config('CHAT_FLUSH_MS', default=5, cast=int)
+CHAT_FLUSH_MAX_MESSAGES = config('CHAT_FLUSH_MAX_MESSAGES', default=100, cast=int)
+CHAT_MAX_MESSAGE_LENGTH = config('CHAT_MAX_MESSAGE_LENGTH', default=4000, cast=int)
+CHAT_RATE_LIMIT = config('CHAT_RATE_LIMIT', default=1.0, cast=float)  # messages/sec per connection
+CHAT_RATE_BURST = config('CHAT_RATE_BURST', default=5, cast=int)
+CHAT_OUTBOUND_QUEUE = config('CHAT_OUTBOUND_QUEUE', default=100, cast=int)  # frames per connection
+
+CELERY_BEAT_SCHEDULE = {
+    # Weekly/monthly boards change as scores age out, not only on updates
+    'materialize-leaderboards': {
+        'task': 'incoscore.tasks.materialize_leaderboards_task',
+        'schedule': LEADERBOARD_REBUILD_SECONDS,
+    },
+    # Saves only flag scores dirty; this recalculates them in bulk
+    'recalculate-dirty-scores': {
+        'task': 'incoscore.tasks.recalculate_dirty_scores_task',
+        'schedule': SCORE_RECALC_SECONDS,
+    },
+    # Saves only record what changed; this refreshes recommendations for all of it at once
+    'refresh-recommendations': {
+        'task': 'recommendations.tasks.refresh_pending_recommendations_task',
+        'schedule': RECOMMENDATION_REFRESH_SECONDS,
+    },
+}
@@ -0,0 +1,101 @@
+"""
+Write-behind views_count for detail endpoints.
+
+Bumping views_count on every GET turned the hottest reads into writes: on
+SQLite each one queued behind the write lock, and the read-modify-write
+lost increments under concurrency. Views are instead buffered in process
+and written as `UPDATE ... SET views_count = views_count + n`, one
+statement per model and n, either:
+
+- on the request path, at most once per VIEW_COUNT_FLUSH_SECONDS, or
+- from a timer, VIEW_COUNT_MAX_STALENESS seconds after the oldest buffered
+  view, so an idle process doesn't sit on its counts.
+
+VIEW_COUNT_FLUSH_SECONDS = 0 writes through on every view. Whatever is
+buffered at shutdown is flushed at exit.
+
+Every web process keeps its own buffer. Flushes only ever add to the
+stored count, so totals stay right however many processes serve views;
+a response just can't include views still buffered in other processes.
+"""
+import atexit
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.db.models import F
+
+
+BATCH_SIZE = 500  # ids per UPDATE, under SQLite's bound-parameter limit
+
+
+class ViewCounter:
+    def __init__(self, field='views_count'):
+        self.field = field
+        self._lock = threading.Lock()
+        self._pending = Counter()  # (model, pk) -> views not yet written
+        self._last_flush = time.monotonic()
+        self._timer = None
+
+    def increment(self, instance):
+        """
+        Count a view of `instance` and add the views buffered for it to its
+        in-memory count, so the response includes them.
+        """
+        key = (instance._meta.concrete_model, instance.pk)
+        with self._lock:
+            self._pending[key] += 1
+            buffered = self._pending[key]
+            if self._timer is None and settings.VIEW_COUNT_MAX_STALENESS > 0:
+                self._timer = threading.Timer(settings.VIEW_COUNT_MAX_STALENESS, self._flush_from_timer)
+                self._timer.daemon = True
+                self._timer.start()
+            due = time.monotonic() - self._last_flush >= settings.VIEW_COUNT_FLUSH_SECONDS
+        setattr(instance, self.field, getattr(instance, self.field) + buffered)
+        if due:
+            self.flush()
+
+    def pending(self):
+        with self._lock:
+            return sum(self._pending.values())
+
+    def flush(self):
+        """Write the buffered views; returns how many were written."""
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+            timer, self._timer = self._timer, None
+            self._last_flush = time.monotonic()
+        if timer is not None:
+            timer.cancel()
+        if not pending:
+            return 0
+
+        # Objects viewed the same number of times share one UPDATE
+        batches = defaultdict(list)
+        for (model, pk), n in pending.items():
+            batches[model, n].append(pk)
+        try:
+            with transaction.atomic():
+                for (model, n), pks in batches.items():
+                    for start in range(0, len(pks), BATCH_SIZE):
+                        model._base_manager.filter(pk__in=pks[start:start + BATCH_SIZE]).update(
+                            **{self.field: F(self.field) + n}
+                        )
+        except DatabaseError:
+            # Keep the views for the next flush rather than fail the request
+            with self._lock:
+                self._pending.update(pending)
+            return 0
+        return sum(pending.values())
+
+    def _flush_from_timer(self):
+        try:
+            self.flush()
+        finally:
+            connection.close()  # the timer thread's own connection
+
+
+view_counter = ViewCounter()
+atexit.register(view_counter.flush)
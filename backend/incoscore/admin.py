@@ -4,7 +4,8 @@ from .models import InCoScore, LeaderboardEntry
 
 @admin.register(InCoScore)
 class InCoScoreAdmin(admin.ModelAdmin):
-    list_display = ['user', 'total_score', 'rank', 'last_calculated']
+    list_display = ['user', 'total_score', 'rank', 'is_dirty', 'last_calculated']
+    list_filter = ['is_dirty']
     ordering = ['-total_score']
 
 
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class IncoscoreConfig(AppConfig):
     name = "incoscore"
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,83 @@
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from accounts.models import StudentProfile, User
+from applications.models import Application
+from community.models import Comment, Post
+from incoscore.models import InCoScore
+from incoscore.scoring import bulk_calculate
+from opportunities.models import Opportunity
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ('Benchmark bulk InCoScore calculation against looping InCoScore.calculate() '
+            'on synthetic users. Everything is created in a transaction that is rolled back.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=2000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(options['users'], random.Random(options['seed']))
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _run(self, n, rng):
+        users = User.objects.bulk_create(
+            User(email=f'bench{i}@bench.invalid', username=f'bench{i}') for i in range(n)
+        )
+        StudentProfile.objects.bulk_create(
+            StudentProfile(user=u, gpa=Decimal(rng.randint(200, 400)) / 100,
+                           profile_completeness=rng.randint(0, 100))
+            for u in users
+        )
+        opportunities = Opportunity.objects.bulk_create(
+            Opportunity(title=f'Bench opportunity {i}', university='Bench', url=f'https://bench.invalid/{i}')
+            for i in range(10)
+        )
+        Application.objects.bulk_create(
+            Application(user=u, opportunity=o, status=rng.choice(['saved', 'submitted']))
+            for u in users for o in rng.sample(opportunities, rng.randint(0, 5))
+        )
+        posts = Post.objects.bulk_create(
+            Post(author=u, title='Bench post', content='...')
+            for u in users for _ in range(rng.randint(0, 3))
+        )
+        Comment.objects.bulk_create(
+            Comment(author=rng.choice(users), post=rng.choice(posts), content='...')
+            for _ in range(n * 3)
+        )
+        InCoScore.objects.bulk_create(InCoScore(user=u) for u in users[: n // 2])
+        bench_users = User.objects.filter(email__endswith='@bench.invalid')
+
+        def loop():
+            for user in bench_users.select_related('profile'):
+                score, _ = InCoScore.objects.get_or_create(user=user)
+                score.calculate()
+
+        self.stdout.write(f'{n} users, half without an InCoScore row')
+        results = {}
+        for name, run in [('loop calculate()', loop), ('bulk_calculate', lambda: bulk_calculate(bench_users))]:
+            InCoScore.objects.filter(user__in=bench_users).update(opportunity_match_score=0)
+            queries = []
+            with connection.execute_wrapper(lambda execute, sql, *rest: queries.append(sql) or execute(sql, *rest)):
+                start = time.perf_counter()
+                run()
+                elapsed = time.perf_counter() - start
+            results[name] = dict(InCoScore.objects.filter(user__in=bench_users).values_list('user_id', 'total_score'))
+            self.stdout.write(f'{name:<18}{elapsed * 1000:10.1f} ms{len(queries):8} queries{n / elapsed:10.0f} users/s')
+
+        loop_totals, bulk_totals = results.values()
+        mismatches = sum(abs(loop_totals[u] - bulk_totals.get(u, -1)) > 1e-9 for u in loop_totals)
+        self.stdout.write(f'score mismatches: {mismatches}')
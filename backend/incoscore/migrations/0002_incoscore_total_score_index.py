@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 07:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("incoscore", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="incoscore",
+            name="total_score",
+            field=models.FloatField(db_index=True, default=0.0),
+        ),
+    ]
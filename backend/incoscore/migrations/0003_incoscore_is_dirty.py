@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 07:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("incoscore", "0002_incoscore_total_score_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="incoscore",
+            name="is_dirty",
+            field=models.BooleanField(db_index=True, default=False),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-18 08:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("incoscore", "0003_incoscore_is_dirty"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RankIndexVersion",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("value", models.BigIntegerField(default=0)),
+            ],
+        ),
+    ]
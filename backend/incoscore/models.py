@@ -4,13 +4,14 @@ from accounts.models import User
 
 class InCoScore(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='incoscore')
-    total_score = models.FloatField(default=0.0)
+    total_score = models.FloatField(default=0.0, db_index=True)
     gpa_score = models.FloatField(default=0.0)
     application_score = models.FloatField(default=0.0)
     community_score = models.FloatField(default=0.0)
     opportunity_match_score = models.FloatField(default=0.0)
     profile_score = models.FloatField(default=0.0)
     rank = models.IntegerField(null=True, blank=True)
+    is_dirty = models.BooleanField(default=False, db_index=True)  # inputs changed since last calculated
     last_calculated = models.DateTimeField(auto_now=True)
 
     def calculate(self):
@@ -39,6 +40,7 @@ class InCoScore(models.Model):
             self.gpa_score + self.application_score +
             self.community_score + self.opportunity_match_score + self.profile_score
         )
+        self.is_dirty = False
         self.save()
         return self.total_score
 
@@ -60,3 +62,15 @@ class LeaderboardEntry(models.Model):
 
     def __str__(self):
         return f"#{self.rank} {self.user.email} ({self.score:.1f})"
+
+
+class RankIndexVersion(models.Model):
+    """
+    One row counting changes to total_score, shared by every process so
+    each can tell whether its in-memory RankIndex has missed any (see
+    incoscore/ranking.py).
+    """
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"rank index v{self.value}"
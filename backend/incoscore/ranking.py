@@ -0,0 +1,110 @@
+import threading
+from bisect import bisect_left, insort
+
+from django.db import transaction
+from django.db.models import F
+
+
+VERSION_ID = 1  # the RankIndexVersion row
+
+
+class RankIndex:
+    """
+    Every total_score kept as a sorted list of negated scores, so a score's
+    rank (1 + the number of strictly higher scores, ties sharing a rank as
+    with RANK()) is one O(log n) bisect. Adding or removing a score shifts
+    the rest of the list, which is O(n) but a single memmove, far cheaper
+    than rebuilding from the database.
+    """
+
+    def __init__(self, version, scores=()):
+        self.version = version
+        self._keys = sorted(-s for s in scores)
+
+    @classmethod
+    def build(cls, version):
+        from incoscore.models import InCoScore
+
+        return cls(version, InCoScore.objects.values_list('total_score', flat=True).iterator(chunk_size=10000))
+
+    def __len__(self):
+        return len(self._keys)
+
+    def rank(self, score):
+        return bisect_left(self._keys, -score) + 1
+
+    def percentile(self, score):
+        return round((1 - self.rank(score) / max(len(self._keys), 1)) * 100, 1)
+
+    def add(self, score):
+        insort(self._keys, -score)
+
+    def remove(self, score):
+        pos = bisect_left(self._keys, -score)
+        if pos < len(self._keys) and self._keys[pos] == -score:
+            del self._keys[pos]
+
+    def update(self, old, new):
+        self.remove(old)
+        self.add(new)
+
+
+_index = None
+_lock = threading.Lock()
+
+
+def _current_version():
+    from incoscore.models import RankIndexVersion
+
+    return RankIndexVersion.objects.filter(id=VERSION_ID).values_list('value', flat=True).first() or 0
+
+
+def get_rank_index():
+    """
+    Shared per-process index. Every score change bumps a version counter
+    in the database; the index is rebuilt only when some other process (or
+    a bulk write) moved the counter past the changes it has applied itself.
+    Checking costs one primary-key lookup.
+    """
+    global _index
+    version = _current_version()
+    if _index is not None and _index.version == version:
+        return _index
+    with _lock:
+        if _index is None or _index.version != version:
+            _index = RankIndex.build(version)
+        return _index
+
+
+def _bump_version():
+    """Add one to the counter and return the new value. The row lock makes this atomic across processes."""
+    from incoscore.models import RankIndexVersion
+
+    versions = RankIndexVersion.objects.filter(id=VERSION_ID)
+    with transaction.atomic():
+        if not versions.update(value=F('value') + 1):
+            RankIndexVersion.objects.get_or_create(id=VERSION_ID)
+            versions.update(value=F('value') + 1)
+        return versions.values_list('value', flat=True).get()
+
+
+def score_changed(old=None, new=None):
+    """
+    Record one score being created (old=None), changed, or deleted (new=None)
+    after commit. The local index is patched in place and stays current as
+    long as no other change slipped in since its version.
+    """
+    with _lock:
+        version = _bump_version()
+        if _index is None or version != _index.version + 1:
+            return
+        if old is not None:
+            _index.remove(old)
+        if new is not None:
+            _index.add(new)
+        _index.version = version
+
+
+def invalidate_rank_index():
+    """Force every process to rebuild, e.g. after bulk score writes."""
+    _bump_version()
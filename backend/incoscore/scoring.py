@@ -0,0 +1,111 @@
+import numpy as np
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from accounts.models import User
+from applications.models import Application
+from community.models import Comment, Post
+from .models import InCoScore
+from .ranking import invalidate_rank_index
+
+
+SCORE_FIELDS = ['gpa_score', 'application_score', 'community_score',
+                'opportunity_match_score', 'profile_score', 'total_score', 'last_calculated']
+
+
+def _count_per_user(model, user_field, **filters):
+    """Correlated COUNT subquery per user that defaults to 0."""
+    counted = (
+        model.objects.filter(**{user_field: OuterRef('pk')}, **filters)
+        .order_by().values(user_field).annotate(n=Count('pk')).values('n')
+    )
+    return Coalesce(Subquery(counted, output_field=IntegerField()), Value(0))
+
+
+def bulk_calculate(users=None):
+    """
+    Recalculate InCoScore for every user (or the `users` queryset) at once.
+
+    All components come from a single annotated query, the weighted sum is
+    done on numpy arrays, and scores are written with one batched upsert on
+    user, which also creates missing rows. Weights match InCoScore.calculate().
+    Returns the number of scores written.
+    """
+    users = User.objects.all() if users is None else users
+    rows = list(
+        users.annotate(
+            submitted_count=_count_per_user(Application, 'user', status='submitted'),
+            post_count=_count_per_user(Post, 'author'),
+            comment_count=_count_per_user(Comment, 'author'),
+        ).values_list(
+            'pk', 'profile__gpa', 'profile__profile_completeness',
+            'submitted_count', 'post_count', 'comment_count',
+            'incoscore__opportunity_match_score',
+        ).order_by('pk')
+    )
+    if not rows:
+        return 0
+
+    user_ids, gpas, completeness, submitted, posts, comments, match_scores = zip(*rows)
+
+    gpa = np.array([float(g) if g else 0.0 for g in gpas])
+    gpa_score = np.minimum((gpa / 4.0) * 100, 100) * 0.25
+    application_score = np.minimum(np.array(submitted) * 10, 100) * 0.20
+    community_score = np.minimum(np.array(posts) * 5 + np.array(comments) * 2, 100) * 0.20
+    # Opportunity match: calculated externally, default from recommendations
+    opportunity_match_score = np.array([m or 0.0 for m in match_scores]) * 0.20
+    profile_score = np.array([c or 0 for c in completeness], dtype=float) * 0.15
+    total_score = gpa_score + application_score + community_score + opportunity_match_score + profile_score
+
+    now = timezone.now()
+    scores = [
+        InCoScore(
+            user_id=user_id,
+            gpa_score=float(gpa_score[i]),
+            application_score=float(application_score[i]),
+            community_score=float(community_score[i]),
+            opportunity_match_score=float(opportunity_match_score[i]),
+            profile_score=float(profile_score[i]),
+            total_score=float(total_score[i]),
+            last_calculated=now,
+        )
+        for i, user_id in enumerate(user_ids)
+    ]
+    # An upsert rather than bulk_update, whose CASE WHEN per field and row
+    # grows quadratically with the batch size
+    InCoScore.objects.bulk_create(
+        scores,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=['user'],
+        update_fields=SCORE_FIELDS,
+    )
+    # bulk_create sends no signals, so the rank index can't patch itself
+    transaction.on_commit(invalidate_rank_index)
+    return len(scores)
+
+
+def period_scores(since):
+    """
+    Activity score per user since `since`: the application and community components of
+    InCoScore, counting only applications submitted and posts and comments written in
+    the period. Users with no activity in it are left out. Returns
+    [(user_id, university, score)], best first.
+    """
+    rows = User.objects.annotate(
+        submitted_count=_count_per_user(Application, 'user', submitted_at__gte=since),
+        post_count=_count_per_user(Post, 'author', created_at__gte=since),
+        comment_count=_count_per_user(Comment, 'author', created_at__gte=since),
+    ).filter(
+        Q(submitted_count__gt=0) | Q(post_count__gt=0) | Q(comment_count__gt=0)
+    ).values_list('pk', 'university', 'submitted_count', 'post_count', 'comment_count')
+
+    scores = [
+        (user_id, university,
+         min(submitted * 10, 100) * 0.20 + min(posts * 5 + comments * 2, 100) * 0.20)
+        for user_id, university, submitted, posts, comments in rows.iterator(chunk_size=2000)
+    ]
+    scores.sort(key=lambda row: (-row[2], row[0]))
+    return scores
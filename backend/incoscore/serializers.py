@@ -11,7 +11,7 @@ class InCoScoreSerializer(serializers.ModelSerializer):
         fields = '__all__'
         read_only_fields = ['user', 'total_score', 'gpa_score', 'application_score',
                             'community_score', 'opportunity_match_score', 'profile_score',
-                            'rank', 'last_calculated']
+                            'rank', 'is_dirty', 'last_calculated']
 
 
 class LeaderboardEntrySerializer(serializers.ModelSerializer):
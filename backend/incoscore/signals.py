@@ -0,0 +1,61 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from accounts.models import StudentProfile
+from applications.models import Application
+from community.models import Comment, Post
+from .models import InCoScore
+from .ranking import score_changed
+from .tasks import mark_score_dirty
+
+
+# Fields of each source model that feed into InCoScore.calculate()
+SCORED_FIELDS = {
+    Application: {'status'},
+    StudentProfile: {'gpa', 'profile_completeness'},
+}
+
+
+@receiver(post_init, sender=InCoScore)
+def remember_total_score(sender, instance, **kwargs):
+    instance._ranked_score = instance.__dict__.get('total_score')
+
+
+@receiver(post_save, sender=InCoScore)
+def total_score_saved(sender, instance, created=False, **kwargs):
+    old, new = (None if created else instance._ranked_score), instance.total_score
+    if old == new and not created:
+        return
+    instance._ranked_score = new
+    transaction.on_commit(lambda: score_changed(old, new))
+
+
+@receiver(post_delete, sender=InCoScore)
+def total_score_deleted(sender, instance, **kwargs):
+    old = instance._ranked_score
+    transaction.on_commit(lambda: score_changed(old, None))
+
+
+@receiver(post_save, sender=Application)
+@receiver(post_save, sender=StudentProfile)
+def scored_instance_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or SCORED_FIELDS[sender] & set(update_fields):
+        mark_score_dirty(instance.user_id)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Comment)
+def contribution_saved(sender, instance, created=False, **kwargs):
+    # Only the number of posts and comments counts, so edits don't matter
+    if created:
+        mark_score_dirty(instance.author_id)
+
+
+@receiver(post_delete, sender=Application)
+@receiver(post_delete, sender=StudentProfile)
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=Comment)
+def scored_instance_deleted(sender, instance, **kwargs):
+    # These are also deleted when their user is, so never create a score here
+    mark_score_dirty(instance.author_id if sender in (Post, Comment) else instance.user_id, create=False)
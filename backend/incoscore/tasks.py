@@ -0,0 +1,226 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from celery import shared_task
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Q, OuterRef, Subquery, Window
+from django.db.models.functions import Rank
+from django.utils import timezone
+
+
+LEADERBOARD_PENDING_KEY = 'incoscore:leaderboard-pending'
+
+# Period -> window of activity its board ranks (None: total_score)
+PERIODS = {'weekly': timedelta(days=7), 'monthly': timedelta(days=30), 'all_time': None}
+
+
+def update_leaderboard():
+    """
+    Rank every InCoScore with RANK() OVER (ORDER BY total_score DESC) in the
+    database and write back only the rows whose rank or score moved: stored
+    ranks with bulk_update, global/all_time leaderboard rows with one upsert.
+    """
+    from incoscore.models import InCoScore, LeaderboardEntry
+
+    entries = LeaderboardEntry.objects.filter(
+        user=OuterRef('user'), category='global', period='all_time'
+    )
+    changed = list(
+        InCoScore.objects.annotate(
+            new_rank=Window(Rank(), order_by=F('total_score').desc()),
+            entry_rank=Subquery(entries.values('rank')[:1]),
+            entry_score=Subquery(entries.values('score')[:1]),
+        ).filter(
+            Q(rank__isnull=True) | ~Q(rank=F('new_rank')) |
+            Q(entry_rank__isnull=True) | ~Q(entry_rank=F('new_rank')) |
+            ~Q(entry_score=F('total_score'))
+        ).values_list('id', 'user_id', 'rank', 'new_rank', 'total_score')
+    )
+    if not changed:
+        return 0
+
+    with transaction.atomic():
+        InCoScore.objects.bulk_update(
+            [InCoScore(id=pk, rank=new_rank)
+             for pk, _, rank, new_rank, _ in changed if rank != new_rank],
+            ['rank'],
+            batch_size=1000,
+        )
+        LeaderboardEntry.objects.bulk_create(
+            [LeaderboardEntry(user_id=user_id, category='global', period='all_time',
+                              rank=new_rank, score=score)
+             for _, user_id, _, new_rank, score in changed],
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['user', 'category', 'period'],
+            update_fields=['rank', 'score'],
+        )
+    return len(changed)
+
+
+def build_leaderboards(now=None):
+    """
+    Rank every (category x period) board, best first. Categories are
+    'global' and each user's university. all_time ranks total_score;
+    weekly and monthly rank the activity score of period_scores() over
+    that window, so they reflect what users did recently. Ties share a
+    rank, as with RANK(). Returns {(category, period): [entries]}.
+    """
+    from incoscore.models import InCoScore, LeaderboardEntry
+    from incoscore.scoring import period_scores
+
+    now = now or timezone.now()
+    boards = defaultdict(list)
+    last = {}  # board -> (score, rank) of its lowest entry so far
+    for period, age in PERIODS.items():
+        if age:
+            rows = period_scores(now - age)
+        else:
+            rows = InCoScore.objects.order_by('-total_score', 'user_id').values_list(
+                'user_id', 'user__university', 'total_score'
+            ).iterator(chunk_size=2000)
+        for user_id, university, score in rows:
+            for category in ('global', university) if university else ('global',):
+                board = boards[category, period]
+                prev_score, prev_rank = last.get((category, period), (None, None))
+                rank = prev_rank if score == prev_score else len(board) + 1
+                last[category, period] = (score, rank)
+                board.append(LeaderboardEntry(
+                    user_id=user_id, category=category, period=period, rank=rank, score=score
+                ))
+    return boards
+
+
+def materialize_leaderboards(now=None):
+    """
+    Bring every per-university and weekly/monthly leaderboard in line with
+    build_leaderboards(), in one transaction: entries whose rank or score
+    moved (or that are new) are upserted, and entries that dropped off a
+    board are deleted, so a run that changes nothing writes nothing.
+    global/all_time is kept up to date incrementally by
+    update_leaderboard() and left alone.
+    """
+    from incoscore.models import LeaderboardEntry
+
+    boards = build_leaderboards(now)
+    boards.pop(('global', 'all_time'), None)
+    rows = LeaderboardEntry.objects.exclude(category='global', period='all_time').values_list(
+        'id', 'user_id', 'category', 'period', 'rank', 'score'
+    )
+    current = {
+        (user_id, category, period): (pk, rank, score)
+        for pk, user_id, category, period, rank, score in rows.iterator(chunk_size=2000)
+    }
+
+    changed = []
+    for entries in boards.values():
+        for entry in entries:
+            key = (entry.user_id, entry.category, entry.period)
+            _, rank, score = current.pop(key, (None, None, None))
+            if (rank, score) != (entry.rank, entry.score):
+                changed.append(entry)
+    dropped = [pk for pk, _, _ in current.values()]
+
+    if changed or dropped:
+        with transaction.atomic():
+            LeaderboardEntry.objects.bulk_create(
+                changed,
+                batch_size=1000,
+                update_conflicts=True,
+                unique_fields=['user', 'category', 'period'],
+                update_fields=['rank', 'score'],
+            )
+            for start in range(0, len(dropped), 1000):
+                LeaderboardEntry.objects.filter(id__in=dropped[start:start + 1000]).delete()
+    return {
+        'boards': len(boards),
+        'entries': sum(map(len, boards.values())),
+        'upserted': len(changed),
+        'deleted': len(dropped),
+    }
+
+
+@shared_task
+def update_leaderboard_task():
+    changed = update_leaderboard()
+    materialize_leaderboards()
+    return changed
+
+
+@shared_task
+def materialize_leaderboards_task():
+    return materialize_leaderboards()
+
+
+def schedule_leaderboard_update():
+    """
+    Queue a leaderboard update unless one is already pending. Requests
+    inside the coalescing window share the next run, which starts after the
+    window closes so that it sees every score they committed.
+    """
+    window = settings.LEADERBOARD_COALESCE_SECONDS
+    if cache.add(LEADERBOARD_PENDING_KEY, True, timeout=window):
+        transaction.on_commit(lambda: update_leaderboard_task.apply_async(countdown=window + 1))
+
+
+@shared_task
+def recalculate_scores_task(user_ids=None):
+    """Recalculate scores in bulk (all users by default), then rerank."""
+    from accounts.models import User
+    from incoscore.scoring import bulk_calculate
+
+    users = None if user_ids is None else User.objects.filter(id__in=user_ids)
+    count = bulk_calculate(users)
+    update_leaderboard()
+    materialize_leaderboards()
+    return count
+
+
+def mark_score_dirty(user_id, create=True):
+    """
+    Flag a user's score for the next recalculate_dirty_scores() run. One
+    UPDATE, in the caller's transaction, plus an INSERT the first time a
+    user without a score changes something; pass create=False when the
+    user may be in the middle of being deleted.
+    """
+    from incoscore.models import InCoScore
+
+    if not InCoScore.objects.filter(user_id=user_id).update(is_dirty=True) and create:
+        InCoScore.objects.bulk_create(
+            [InCoScore(user_id=user_id, is_dirty=True)], ignore_conflicts=True
+        )
+
+
+def recalculate_dirty_scores(batch_size=None):
+    """
+    Recalculate dirty scores with bulk_calculate(), batch_size users at a
+    time, then rerank once. Runs every SCORE_RECALC_SECONDS from beat.
+    Flags are cleared before each batch is read, in the same transaction,
+    so a change committed meanwhile marks the score dirty again for the
+    next run instead of being lost.
+    """
+    from accounts.models import User
+    from incoscore.models import InCoScore
+    from incoscore.scoring import bulk_calculate
+
+    batch_size = batch_size or settings.SCORE_RECALC_BATCH_SIZE
+    done = 0
+    while True:
+        with transaction.atomic():
+            user_ids = list(InCoScore.objects.filter(is_dirty=True).order_by('user_id')
+                            .values_list('user_id', flat=True)[:batch_size])
+            if not user_ids:
+                break
+            InCoScore.objects.filter(user_id__in=user_ids).update(is_dirty=False)
+            done += bulk_calculate(User.objects.filter(id__in=user_ids))
+    if done:
+        update_leaderboard()
+        materialize_leaderboards()
+    return done
+
+
+@shared_task
+def recalculate_dirty_scores_task():
+    return recalculate_dirty_scores()
@@ -1,3 +1,188 @@
+from datetime import timedelta
+
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db.models import F
 from django.test import TestCase
+from django.utils import timezone
+
+from accounts.models import StudentProfile, User
+from applications.models import Application
+from community.models import Comment, Post
+from opportunities.models import Opportunity
+from .models import InCoScore, LeaderboardEntry, RankIndexVersion
+from .ranking import RankIndex, get_rank_index, invalidate_rank_index
+from .scoring import bulk_calculate
+from .tasks import (
+    mark_score_dirty, materialize_leaderboards, recalculate_dirty_scores, schedule_leaderboard_update,
+    update_leaderboard,
+)
+
+
+def make_scores(*totals):
+    scores = []
+    for i, total in enumerate(totals):
+        user = User.objects.create_user(email=f'u{i}@example.edu', username=f'u{i}', password='x' * 12)
+        scores.append(InCoScore.objects.create(user=user, total_score=total))
+    return scores
+
+
+class UpdateLeaderboardTests(TestCase):
+    def test_ranks_with_ties_and_writes_only_changes(self):
+        a, b, c, d = make_scores(50, 80, 80, 10)
+        self.assertEqual(update_leaderboard(), 4)
+        ranks = dict(InCoScore.objects.values_list('id', 'rank'))
+        self.assertEqual([ranks[s.id] for s in (a, b, c, d)], [3, 1, 1, 4])
+        self.assertEqual(LeaderboardEntry.objects.get(user=a.user, category='global').rank, 3)
+
+        self.assertEqual(update_leaderboard(), 0)
+
+        InCoScore.objects.filter(id=d.id).update(total_score=60)
+        self.assertEqual(update_leaderboard(), 2)
+        self.assertEqual(InCoScore.objects.get(id=d.id).rank, 3)
+        self.assertEqual(InCoScore.objects.get(id=a.id).rank, 4)
+
+
+class BulkCalculateTests(TestCase):
+    def test_matches_calculate_and_creates_missing_scores(self):
+        a, b = make_scores(0, 0)
+        StudentProfile.objects.create(user=a.user, gpa='3.60', profile_completeness=75)
+        post = Post.objects.create(author=a.user, title='Hello', content='...')
+        Comment.objects.create(author=b.user, post=post, content='...')
+        InCoScore.objects.filter(id=b.id).update(opportunity_match_score=40)
+        c = User.objects.create_user(email='c@example.edu', username='c', password='x' * 12)
+
+        self.assertEqual(bulk_calculate(), 3)
+        bulk = dict(InCoScore.objects.values_list('user_id', 'total_score'))
+        self.assertIn(c.id, bulk)
+
+        InCoScore.objects.filter(id=b.id).update(opportunity_match_score=40)
+        for score in InCoScore.objects.all():
+            self.assertAlmostEqual(score.calculate(), bulk[score.user_id])
+
+
+class MaterializeLeaderboardsTests(TestCase):
+    def board(self, category, period):
+        return list(LeaderboardEntry.objects.filter(category=category, period=period)
+                    .order_by('rank', 'user_id').values_list('user_id', 'rank'))
+
+    def test_builds_university_and_period_boards(self):
+        a, b, c, d = make_scores(50, 80, 80, 10)
+        User.objects.filter(id__in=[a.user_id, b.user_id]).update(university='Yale')
+        User.objects.filter(id=c.user_id).update(university='Brown')
+        now = timezone.now()
+        post = Post.objects.create(author=a.user, title='Hello', content='...')
+        Post.objects.create(author=a.user, title='Again', content='...')
+        old = Post.objects.create(author=b.user, title='Old', content='...')
+        Post.objects.filter(id=old.id).update(created_at=now - timedelta(days=10))
+        Comment.objects.create(author=d.user, post=post, content='...')
+        opportunity = Opportunity.objects.create(title='Grant', university='Brown', url='https://b.edu/1')
+        Application.objects.create(user=c.user, opportunity=opportunity, status='submitted',
+                                   submitted_at=now - timedelta(days=3))
+        update_leaderboard()
+
+        self.assertEqual(materialize_leaderboards(), {'boards': 8, 'entries': 15, 'upserted': 15, 'deleted': 0})
+        self.assertEqual(self.board('Yale', 'all_time'), [(b.user_id, 1), (a.user_id, 2)])
+        self.assertEqual(self.board('Yale', 'weekly'), [(a.user_id, 1)])
+        self.assertEqual(self.board('global', 'monthly'),
+                         [(a.user_id, 1), (c.user_id, 1), (b.user_id, 3), (d.user_id, 4)])
+        self.assertEqual(self.board('global', 'weekly'), [(a.user_id, 1), (c.user_id, 1), (d.user_id, 3)])
+        self.assertEqual(len(self.board('global', 'all_time')), 4)
+
+        with self.assertNumQueries(4):  # all-time scores, two periods, the boards; nothing written
+            self.assertEqual(materialize_leaderboards()['upserted'], 0)
+
+        User.objects.filter(id=c.user_id).update(university='')
+        self.assertEqual(materialize_leaderboards(), {'boards': 5, 'entries': 12, 'upserted': 0, 'deleted': 3})
+        self.assertEqual(self.board('Brown', 'all_time'), [])
+        self.assertEqual(len(self.board('global', 'all_time')), 4)
+
+    def test_period_boards_rank_activity_in_the_window(self):
+        a, b = make_scores(90, 10)
+        old = Post.objects.create(author=a.user, title='Old', content='...')
+        Post.objects.filter(id=old.id).update(created_at=timezone.now() - timedelta(days=20))
+        Post.objects.create(author=b.user, title='New', content='...')
+        update_leaderboard()
+        materialize_leaderboards()
+
+        self.assertEqual(LeaderboardEntry.objects.get(user=a.user, period='all_time').rank, 1)
+        self.assertEqual(self.board('global', 'weekly'), [(b.user_id, 1)])
+        self.assertEqual(self.board('global', 'monthly'), [(a.user_id, 1), (b.user_id, 1)])
+
+
+class ScheduleLeaderboardUpdateTests(TestCase):
+    def test_requests_in_the_window_share_one_run(self):
+        # The pending flag must be visible to every web and worker process
+        self.assertNotIsInstance(caches['default'], LocMemCache)
+        with self.captureOnCommitCallbacks() as callbacks:
+            schedule_leaderboard_update()
+            schedule_leaderboard_update()
+        self.assertEqual(len(callbacks), 1)
+
+
+class RankIndexTests(TestCase):
+    def setUp(self):
+        invalidate_rank_index()
+
+    def test_rank_and_percentile(self):
+        index = RankIndex(0, [50, 80, 80, 10])
+        self.assertEqual([index.rank(s) for s in (80, 50, 10, 90)], [1, 3, 4, 1])
+        self.assertEqual(index.percentile(50), 25.0)
+        index.update(80, 5)
+        self.assertEqual([index.rank(s) for s in (80, 50, 5)], [1, 2, 4])
+
+    def test_saves_patch_the_shared_index_without_rebuilding(self):
+        a, b = make_scores(50, 80)
+        index = get_rank_index()
+        self.assertEqual(index.rank(50), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            a.total_score = 90
+            a.save()
+        with self.assertNumQueries(1):  # the version check
+            self.assertIs(get_rank_index(), index)
+        self.assertEqual(index.rank(90), 1)
+        self.assertEqual(index.rank(80), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            b.delete()
+        self.assertEqual(len(get_rank_index()), 1)
+
+        # A change another process made leaves this index behind, so it's rebuilt
+        RankIndexVersion.objects.update(value=F('value') + 1)
+        self.assertIsNot(get_rank_index(), index)
+
+
+class DirtyScoreTests(TestCase):
+    def test_changes_mark_scores_dirty_until_recalculated(self):
+        (score,) = make_scores(0)
+        other = User.objects.create_user(email='o@example.edu', username='o', password='x' * 12)
+        with self.captureOnCommitCallbacks(execute=True):
+            post = Post.objects.create(author=score.user, title='Hello', content='...')
+            Comment.objects.create(author=other, post=post, content='...')
+        self.assertTrue(InCoScore.objects.get(id=score.id).is_dirty)
+        self.assertTrue(InCoScore.objects.get(user=other).is_dirty)
+
+        self.assertEqual(recalculate_dirty_scores(batch_size=1), 2)
+        score.refresh_from_db()
+        self.assertFalse(score.is_dirty)
+        self.assertEqual(score.community_score, 1.0)
+        self.assertEqual(score.rank, 1)
+        self.assertEqual(recalculate_dirty_scores(), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            post.views_count = 5
+            post.save(update_fields=['views_count'])
+        self.assertFalse(InCoScore.objects.get(id=score.id).is_dirty)
+
+        with self.assertNumQueries(1):  # no task is queued; beat runs the recalculation
+            mark_score_dirty(score.user_id)
 
-# Create your tests here.
+    def test_deleting_a_user_does_not_recreate_their_score(self):
+        user = User.objects.create_user(email='d@example.edu', username='d', password='x' * 12)
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.create(author=user, title='Hello', content='...')
+        user_id = user.id
+        with self.captureOnCommitCallbacks(execute=True):
+            user.delete()
+        self.assertFalse(InCoScore.objects.filter(user_id=user_id).exists())
@@ -1,11 +1,10 @@
 from rest_framework import generics, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
-from django.contrib.auth import get_user_model
 from .models import InCoScore, LeaderboardEntry
+from .ranking import get_rank_index
 from .serializers import InCoScoreSerializer, LeaderboardEntrySerializer
-
-User = get_user_model()
+from .tasks import schedule_leaderboard_update
 
 
 class MyScoreView(generics.RetrieveAPIView):
@@ -22,24 +21,10 @@ class MyScoreView(generics.RetrieveAPIView):
 def recalculate_score(request):
     score, _ = InCoScore.objects.get_or_create(user=request.user)
     new_score = score.calculate()
-    # Update leaderboard
-    _update_leaderboard()
+    schedule_leaderboard_update()
     return Response({'score': new_score, 'details': InCoScoreSerializer(score).data})
 
 
-def _update_leaderboard():
-    scores = InCoScore.objects.order_by('-total_score').select_related('user')
-    for rank, score in enumerate(scores, start=1):
-        score.rank = rank
-        score.save(update_fields=['rank'])
-        LeaderboardEntry.objects.update_or_create(
-            user=score.user,
-            category='global',
-            period='all_time',
-            defaults={'rank': rank, 'score': score.total_score}
-        )
-
-
 class GlobalLeaderboardView(generics.ListAPIView):
     serializer_class = LeaderboardEntrySerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
@@ -57,13 +42,12 @@ class GlobalLeaderboardView(generics.ListAPIView):
 def dashboard_stats(request):
     user = request.user
     score, _ = InCoScore.objects.get_or_create(user=user)
-    total_users = User.objects.count()
-    rank = score.rank or total_users
+    index = get_rank_index()
     return Response({
         'incoscore': score.total_score,
-        'rank': rank,
-        'total_users': total_users,
-        'percentile': round((1 - rank / max(total_users, 1)) * 100, 1),
+        'rank': index.rank(score.total_score),
+        'total_users': len(index),
+        'percentile': index.percentile(score.total_score),
         'breakdown': {
             'gpa': score.gpa_score,
             'applications': score.application_score,
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Opportunity, ScrapingJob
+from .models import Opportunity, ScrapingJob, ScrapingSource
 
 
 @admin.register(Opportunity)
@@ -12,5 +12,11 @@ class OpportunityAdmin(admin.ModelAdmin):
 
 @admin.register(ScrapingJob)
 class ScrapingJobAdmin(admin.ModelAdmin):
-    list_display = ['university', 'source_url', 'status', 'opportunities_found', 'created_at']
-    list_filter = ['status']
+    list_display = ['university', 'source_url', 'status', 'skip_reason', 'opportunities_found', 'created_at']
+    list_filter = ['status', 'skip_reason']
+
+
+@admin.register(ScrapingSource)
+class ScrapingSourceAdmin(admin.ModelAdmin):
+    list_display = ['source_url', 'etag', 'last_modified', 'last_scraped_at']
+    search_fields = ['source_url']
@@ -0,0 +1,105 @@
+import re
+
+
+DOMAIN_KEYWORDS = {
+    'research': ['research', 'laboratory', 'lab', 'study', 'experiment', 'investigation'],
+    'fellowship': ['fellowship', 'fellow', 'award', 'honor'],
+    'internship': ['internship', 'intern', 'training', 'placement'],
+    'scholarship': ['scholarship', 'grant', 'financial aid', 'funding', 'stipend'],
+    'conference': ['conference', 'symposium', 'workshop', 'seminar'],
+    'competition': ['competition', 'contest', 'challenge', 'hackathon'],
+    'grant': ['grant', 'funding', 'support', 'award'],
+}
+
+
+def _alternation(words):
+    """
+    Regex alternation of words factored into a trie ('lab(?:oratory)?'), so the engine
+    tries each leading character once; every branch is greedy, i.e. longest match first.
+    """
+    root = {}
+    for word in words:
+        node = root
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def emit(node):
+        branches = [re.escape(char) + emit(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else f'(?:{"|".join(branches)})'
+        return f'(?:{body})?' if '' in node else body
+
+    return emit(root)
+
+
+class KeywordMatcher:
+    """
+    Keyword scorer compiled once from a {label: [keywords]} map into a single regex,
+    so each text is scanned once however many keywords there are. Keywords match as
+    whole words, optionally ending in -s, -es, -ed or -ing: 'labs' and 'supported'
+    count, 'label', 'collaborate', 'international' and 'honorable' don't. The longest
+    keyword wins, and a match also counts every keyword it contains, so 'fellowship'
+    scores both 'fellowship' and 'fellow'.
+
+    This differs from the old substring scan exactly where a keyword only occurs
+    inside an unrelated word; those hits no longer count.
+    """
+
+    def __init__(self, keyword_map):
+        self.labels = list(keyword_map)
+        labels_of = {}
+        for label_idx, label in enumerate(self.labels):
+            for kw in keyword_map[label]:
+                labels_of.setdefault(kw.lower(), []).append(label_idx)
+        self.pattern = re.compile(
+            rf'(?<!\w)({_alternation(labels_of)})(?:s|es|ed|ing)?(?!\w)'
+        )
+        # keyword -> (keyword, label index) pairs it scores, including keywords inside it
+        self.implies = {
+            kw: {
+                (other, label_idx)
+                for other in labels_of if other in kw
+                for label_idx in labels_of[other]
+            }
+            for kw in labels_of
+        }
+
+    def _counts(self, keywords):
+        matched = set().union(*map(self.implies.__getitem__, keywords))
+        counts = [0] * len(self.labels)
+        for _, label_idx in matched:
+            counts[label_idx] += 1
+        return counts
+
+    def scores(self, text):
+        """Number of distinct keywords matched per label."""
+        return self._counts(set(self.pattern.findall(text.lower())))
+
+    def scores_many(self, texts):
+        """scores() for each text in a batch."""
+        pattern, counts = self.pattern, self._counts
+        return [counts(set(pattern.findall(text.lower()))) for text in texts]
+
+
+_MATCHER = KeywordMatcher(DOMAIN_KEYWORDS)
+
+
+def _best_domain(counts):
+    best = max(range(len(counts)), key=counts.__getitem__)
+    return _MATCHER.labels[best] if counts[best] > 0 else 'other'
+
+
+def domain_scores(text):
+    return dict(zip(_MATCHER.labels, _MATCHER.scores(text)))
+
+
+def classify_domain(text):
+    """NLP-lite domain classifier using keyword scoring."""
+    return _best_domain(_MATCHER.scores(text))
+
+
+def classify_domains(texts):
+    """Classify a page's worth of texts in one call."""
+    return [_best_domain(counts) for counts in _MATCHER.scores_many(texts)]
@@ -0,0 +1,105 @@
+import re
+from datetime import date
+from functools import lru_cache
+
+
+MONTHS = {
+    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
+    'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12,
+}
+
+_MONTH = (r'(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?'
+          r'|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)\.?')
+_DAY = r'\d{1,2}(?:st|nd|rd|th)?'
+_YEAR = r'\d{4}'
+_DASH = r'\s*(?:-|–|—|to|through|until)\s*'
+
+_ISO = rf'{_YEAR}-\d{{1,2}}-\d{{1,2}}'
+_MDY = rf'{_MONTH}\s+{_DAY},?\s+{_YEAR}'
+_DMY = rf'{_DAY}\s+{_MONTH},?\s+{_YEAR}'
+
+# Alternatives are tried left to right at each position, so ranges come
+# before the single-date forms they start with. For a range the deadline
+# is its end date, which is what the named groups capture; a range whose
+# start is a full date is an optional prefix of the single-date form.
+DEADLINE_RE = re.compile(
+    rf'''
+    \b(?:
+        (?:{_ISO}{_DASH})?(?P<iso>{_ISO})
+      | {_MONTH}\s+{_DAY}{_DASH}(?P<mdr_end>(?:{_MONTH}\s+)?{_DAY},?\s+{_YEAR})
+      | {_DAY}(?:\s+{_MONTH})?{_DASH}(?P<dmr_end>{_DMY})
+      | (?:{_MDY}{_DASH})?(?P<mdy>{_MDY})
+      | (?:{_DMY}{_DASH})?(?P<dmy>{_DMY})
+    )\b
+    ''',
+    re.IGNORECASE | re.VERBOSE,
+)
+_MDR_START_RE = re.compile(rf'({_MONTH})\s+{_DAY}{_DASH}', re.IGNORECASE)
+
+# Every supported format contains a year, and years are rare in running
+# text, so the full pattern only runs in a window around each one. The
+# window after a year is wide enough for a range's full end date.
+_YEAR_RE = re.compile(r'(?<!\d)(?:19|20)\d\d(?!\d)')
+_WINDOW_BEFORE = 48
+_WINDOW_AFTER = 36
+_TOKEN_RE = re.compile(r'[a-z]+|\d+', re.IGNORECASE)
+
+
+@lru_cache(maxsize=4096)
+def parse_date(text):
+    """
+    Parse one matched date string ('2026-03-01', 'March 1, 2026',
+    '1st Mar 2026', ...). Memoized because the same deadline strings repeat
+    heavily across a page. Returns None for impossible dates.
+    """
+    if text[:4].isdigit() and '-' in text:
+        year, month, day = (int(part) for part in text.split('-'))
+    else:
+        month = day = year = None
+        for token in _TOKEN_RE.findall(text.lower()):
+            if token.isdigit():
+                if len(token) == 4:
+                    year = int(token)
+                else:
+                    day = int(token)
+            elif token[:3] in MONTHS and month is None:
+                month = MONTHS[token[:3]]
+        if None in (month, day, year):
+            return None
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
+def _match_date(match):
+    groups = match.groupdict()
+    if groups['mdr_end']:
+        end = groups['mdr_end']
+        if not any(c.isalpha() for c in end.split()[0]):
+            # 'March 1 - 15, 2026': the end date borrows the start month
+            end = _MDR_START_RE.match(match.group(0)).group(1) + ' ' + end
+        return parse_date(end)
+    for name in ('iso', 'dmr_end', 'mdy', 'dmy'):
+        if groups[name]:
+            return parse_date(groups[name])
+    return None
+
+
+def extract_deadline(text):
+    """Return the first recognizable deadline in `text`, or None."""
+    scanned = 0
+    for year in _YEAR_RE.finditer(text):
+        start = max(scanned, year.start() - _WINDOW_BEFORE)
+        end = year.end() + _WINDOW_AFTER
+        for match in DEADLINE_RE.finditer(text, start, end):
+            deadline = _match_date(match)
+            if deadline is not None:
+                return deadline
+        scanned = max(scanned, year.start())
+    return None
+
+
+def extract_deadlines(texts):
+    """Deadline for each of a page's texts, sharing the compiled pattern and cache."""
+    return [extract_deadline(text) for text in texts]
@@ -0,0 +1,187 @@
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup
+from lxml import etree
+
+
+CONTAINER_TAGS = frozenset(['article', 'div', 'li'])
+TITLE_TAGS = frozenset(['h1', 'h2', 'h3', 'a'])
+SKIP_TAGS = frozenset(['script', 'style', 'template', 'noscript'])
+MAX_CANDIDATES = 50
+MAX_TITLE = 500
+MAX_DESCRIPTION = 1000
+MIN_TITLE = 10
+
+
+class _Container:
+    __slots__ = ('tag', 'parts', 'size', 'title')
+
+    def __init__(self, tag):
+        self.tag = tag
+        self.parts = []
+        self.size = 0
+        self.title = None
+
+
+class _Title:
+    __slots__ = ('tag', 'parts', 'size', 'href', 'claimed')
+
+    def __init__(self, tag, href):
+        self.tag = tag
+        self.parts = []
+        self.size = 0
+        self.href = href
+        self.claimed = False
+
+
+class _LimitReached(Exception):
+    pass
+
+
+class CandidateCollector:
+    """
+    Event handler that turns start/end/data callbacks into opportunity
+    candidates without building a document tree.
+
+    Only open article/div/li containers and their first h1/h2/h3/a element
+    are tracked, and each keeps at most the characters it can use, so memory
+    is bounded by nesting depth rather than page size. When containers nest,
+    the innermost one that owns a title element emits it and enclosing
+    containers that would re-extract the same title are skipped.
+    """
+
+    def __init__(self, base_url, limit=MAX_CANDIDATES):
+        self.base_url = base_url
+        self.limit = limit
+        self.candidates = []
+        self._stack = []
+        self._containers = []
+        self._titles = []
+        self._skip_depth = 0
+        self._pending = []
+
+    # lxml parser target interface
+    def start(self, tag, attrs):
+        self._flush_text()
+        tag = tag.lower()
+        self._stack.append(tag)
+        if tag in SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag in CONTAINER_TAGS:
+            self._containers.append(_Container(tag))
+        elif tag in TITLE_TAGS:
+            title = _Title(tag, attrs.get('href'))
+            self._titles.append(title)
+            for container in self._containers:
+                if container.title is None:
+                    container.title = title
+
+    def end(self, tag):
+        self._flush_text()
+        tag = tag.lower()
+        if tag not in self._stack:
+            return
+        while self._stack:
+            open_tag = self._stack.pop()
+            self._close(open_tag)
+            if open_tag == tag:
+                break
+
+    def data(self, text):
+        if not self._skip_depth:
+            self._pending.append(text)
+
+    def close(self):
+        self._flush_text()
+        while self._stack:
+            self._close(self._stack.pop())
+        return self.candidates
+
+    def _close(self, tag):
+        if tag in SKIP_TAGS:
+            self._skip_depth -= 1
+        elif tag in CONTAINER_TAGS and self._containers:
+            self._emit(self._containers.pop())
+        elif tag in TITLE_TAGS and self._titles:
+            self._titles.pop()
+
+    def _flush_text(self):
+        if not self._pending:
+            return
+        text = ''.join(self._pending).strip()
+        self._pending = []
+        if not text:
+            return
+        for node in self._containers:
+            if node.size < MAX_DESCRIPTION:
+                node.parts.append(text)
+                node.size += len(text)
+        for node in self._titles:
+            if node.size < MAX_TITLE:
+                node.parts.append(text)
+                node.size += len(text)
+
+    def _emit(self, container):
+        if len(self.candidates) >= self.limit:
+            # lxml may deliver a few more events after the limit is raised
+            raise _LimitReached
+        title_el = container.title
+        if title_el is None or title_el.claimed:
+            return
+        title_el.claimed = True
+        title = ''.join(title_el.parts)
+        if len(title) < MIN_TITLE:
+            return
+        link = title_el.href or self.base_url
+        if link and not link.startswith('http'):
+            link = urljoin(self.base_url, link)
+        self.candidates.append({
+            'url': link,
+            'title': title[:MAX_TITLE],
+            'description': ''.join(container.parts)[:MAX_DESCRIPTION],
+        })
+        if len(self.candidates) >= self.limit:
+            raise _LimitReached
+
+
+def stream_candidates(chunks, base_url, encoding=None, limit=MAX_CANDIDATES):
+    """
+    Extract candidates from an iterable of byte chunks with lxml's
+    event-target parser, stopping as soon as `limit` candidates are found.
+
+    Finds the same titles as soup_candidates() but emits each title element
+    once, from the innermost container holding it, where soup_candidates()
+    repeats it for every enclosing container. `limit` counts candidates,
+    not containers scanned.
+    """
+    collector = CandidateCollector(base_url, limit=limit)
+    parser = etree.HTMLParser(target=collector, encoding=encoding, recover=True)
+    try:
+        for chunk in chunks:
+            if chunk:
+                parser.feed(chunk)
+        parser.close()
+        return collector.close()
+    except _LimitReached:
+        return collector.candidates
+
+
+def soup_candidates(content, base_url, limit=MAX_CANDIDATES):
+    """Extract candidates from a fully loaded page with BeautifulSoup."""
+    soup = BeautifulSoup(content, 'html.parser')
+    candidates = []
+
+    # Generic opportunity extraction heuristic
+    for article in soup.find_all(['article', 'div', 'li'], limit=limit):
+        title_el = article.find(['h1', 'h2', 'h3', 'a'])
+        if not title_el or len(title_el.get_text(strip=True)) < MIN_TITLE:
+            continue
+        link = title_el.get('href', base_url)
+        if link and not link.startswith('http'):
+            link = urljoin(base_url, link)
+        candidates.append({
+            'url': link,
+            'title': title_el.get_text(strip=True)[:MAX_TITLE],
+            'description': article.get_text(strip=True)[:MAX_DESCRIPTION],
+        })
+    return candidates
@@ -0,0 +1,70 @@
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Opportunity
+from .signals import opportunities_changed
+
+
+# Fields refreshed on an existing opportunity when a re-scrape finds new values
+UPDATABLE_FIELDS = ['title', 'description', 'deadline']
+
+
+def ingest_candidates(candidates, university):
+    """
+    Upsert a page's worth of scraped candidates in a single transaction.
+
+    Candidates are dicts with url, title, description, domain and deadline.
+    They are deduplicated by URL, existing rows are fetched with one
+    `url__in` query, new rows go through bulk_create and changed rows through
+    bulk_update. Returns {'inserted': n, 'updated': n, 'skipped': n}.
+    """
+    counts = {'inserted': 0, 'updated': 0, 'skipped': 0}
+
+    unique = {}
+    for candidate in candidates:
+        if candidate['url'] in unique:
+            counts['skipped'] += 1
+        else:
+            unique[candidate['url']] = candidate
+    if not unique:
+        return counts
+
+    with transaction.atomic():
+        existing = {
+            opp.url: opp
+            for opp in Opportunity.objects.filter(url__in=list(unique)).only('id', 'url', *UPDATABLE_FIELDS)
+        }
+
+        to_create, to_update = [], []
+        for url, candidate in unique.items():
+            opp = existing.get(url)
+            if opp is None:
+                to_create.append(Opportunity(university=university, **candidate))
+                continue
+            changed = False
+            for field in UPDATABLE_FIELDS:
+                value = candidate.get(field)
+                if value is not None and getattr(opp, field) != value:
+                    setattr(opp, field, value)
+                    changed = True
+            if changed:
+                to_update.append(opp)
+            else:
+                counts['skipped'] += 1
+
+        if to_create:
+            Opportunity.objects.bulk_create(to_create)
+        if to_update:
+            # bulk_update skips auto_now, and the recommendation index keys off updated_at
+            now = timezone.now()
+            for opp in to_update:
+                opp.updated_at = now
+            Opportunity.objects.bulk_update(to_update, UPDATABLE_FIELDS + ['updated_at'])
+
+        changed_ids = [opp.id for opp in to_create + to_update if opp.id is not None]
+        if changed_ids:
+            transaction.on_commit(lambda: opportunities_changed.send(sender=Opportunity, ids=changed_ids))
+
+    counts['inserted'] = len(to_create)
+    counts['updated'] = len(to_update)
+    return counts
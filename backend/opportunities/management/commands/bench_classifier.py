@@ -0,0 +1,68 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from opportunities.classifier import DOMAIN_KEYWORDS, classify_domain, classify_domains
+
+
+FILLER = ('students university program campus summer faculty apply department application '
+          'undergraduate graduate eligible deadline opportunity project team mentor label '
+          'interested science engineering policy global community').split()
+
+
+def classify_domain_substring(text):
+    """The previous implementation: one substring scan per keyword."""
+    text_lower = text.lower()
+    scores = {domain: 0 for domain in DOMAIN_KEYWORDS}
+    for domain, keywords in DOMAIN_KEYWORDS.items():
+        for kw in keywords:
+            if kw in text_lower:
+                scores[domain] += 1
+    best = max(scores, key=scores.get)
+    return best if scores[best] > 0 else 'other'
+
+
+def build_corpus(size, words, keyword_rate=0.05, seed=0):
+    rng = random.Random(seed)
+    keywords = [kw for kws in DOMAIN_KEYWORDS.values() for kw in kws]
+
+    def word():
+        return rng.choice(keywords) if rng.random() < keyword_rate else rng.choice(FILLER)
+
+    return [' '.join(word() for _ in range(words)).capitalize() + '.' for _ in range(size)]
+
+
+class Command(BaseCommand):
+    help = 'Micro-benchmark the domain classifier against the per-keyword substring scan.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--texts', type=int, default=2000)
+        parser.add_argument('--words', type=int, default=150, help='Words per text (~1000 chars at 150).')
+        parser.add_argument('--keyword-rate', type=float, default=0.05, help='Fraction of words that are keywords.')
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        corpus = build_corpus(options['texts'], options['words'], options['keyword_rate'])
+        runs = {
+            'substring scan': lambda: [classify_domain_substring(t) for t in corpus],
+            'compiled matcher': lambda: [classify_domain(t) for t in corpus],
+            'compiled batch': lambda: classify_domains(corpus),
+        }
+        baseline = None
+        for name, run in runs.items():
+            best = min(self._time(run) for _ in range(options['repeat']))
+            baseline = baseline or best
+            self.stdout.write(
+                f'{name:<20} {best * 1000:8.1f} ms  '
+                f'{len(corpus) / best:10.0f} texts/s  x{baseline / best:.2f}'
+            )
+
+        differ = sum(a != b for a, b in zip(classify_domains(corpus), map(classify_domain_substring, corpus)))
+        self.stdout.write(f'{differ} of {len(corpus)} texts classified differently (word-boundary matching)')
+
+    @staticmethod
+    def _time(run):
+        start = time.perf_counter()
+        run()
+        return time.perf_counter() - start
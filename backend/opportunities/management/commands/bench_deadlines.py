@@ -0,0 +1,60 @@
+import re
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from opportunities.deadlines import extract_deadline, extract_deadlines, parse_date
+from opportunities.extraction import stream_candidates
+
+
+FIXTURE_DIR = Path(__file__).resolve().parents[2] / 'fixtures' / 'pages'
+
+
+def extract_deadline_dateutil(desc):
+    """The previous implementation: uncompiled search plus dateutil per article."""
+    date_match = re.search(r'\b(\w+ \d{1,2},? \d{4})\b', desc)
+    if date_match:
+        from dateutil import parser as dateparser
+        try:
+            return dateparser.parse(date_match.group(1)).date()
+        except Exception:
+            pass
+    return None
+
+
+class Command(BaseCommand):
+    help = 'Benchmark deadline extraction over descriptions taken from the fixture pages.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--copies', type=int, default=20, help='Times the fixture corpus is repeated.')
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        texts = []
+        for path in sorted(FIXTURE_DIR.glob('*.html')):
+            texts += [c['description'] for c in stream_candidates([path.read_bytes()], 'https://example.edu/')]
+        corpus = texts * options['copies']
+
+        runs = {
+            'dateutil per text': lambda: [extract_deadline_dateutil(t) for t in corpus],
+            'compiled, cold cache': lambda: (parse_date.cache_clear(), [extract_deadline(t) for t in corpus]),
+            'compiled batch': lambda: extract_deadlines(corpus),
+        }
+        self.stdout.write(f'{len(corpus)} texts ({len(texts)} distinct)')
+        baseline = None
+        for name, run in runs.items():
+            best = min(self._time(run) for _ in range(options['repeat']))
+            baseline = baseline or best
+            self.stdout.write(f'{name:<22}{best * 1000:9.1f} ms{len(corpus) / best:12.0f} texts/s  x{baseline / best:.1f}')
+
+        found_old = sum(extract_deadline_dateutil(t) is not None for t in texts)
+        found_new = sum(d is not None for d in extract_deadlines(texts))
+        self.stdout.write(f'deadlines found: dateutil {found_old}, compiled {found_new} of {len(texts)}')
+        self.stdout.write(f'parse cache: {parse_date.cache_info()}')
+
+    @staticmethod
+    def _time(run):
+        start = time.perf_counter()
+        run()
+        return time.perf_counter() - start
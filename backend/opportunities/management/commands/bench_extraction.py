@@ -0,0 +1,53 @@
+import time
+import tracemalloc
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from opportunities import extraction
+from opportunities.scraper import CHUNK_SIZE
+
+
+FIXTURE_DIR = Path(__file__).resolve().parents[2] / 'fixtures' / 'pages'
+
+
+def chunked(content):
+    for start in range(0, len(content), CHUNK_SIZE):
+        yield content[start:start + CHUNK_SIZE]
+
+
+class Command(BaseCommand):
+    help = 'Compare time and peak memory of BeautifulSoup and streaming extraction on saved pages.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('pages', nargs='*', help='HTML files (defaults to the bundled fixture pages).')
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        paths = [Path(p) for p in options['pages']] or sorted(FIXTURE_DIR.glob('*.html'))
+        self.stdout.write('tracemalloc does not see libxml2 allocations made by the streaming parser')
+        self.stdout.write(f'{"page":<28}{"KB":>7}  {"mode":<8}{"ms":>9}{"peak KB":>10}{"found":>7}')
+
+        for path in paths:
+            content = path.read_bytes()
+            url = f'https://example.edu/{path.name}'
+            runs = {
+                'soup': lambda: extraction.soup_candidates(content, url),
+                'stream': lambda: extraction.stream_candidates(chunked(content), url),
+            }
+            for mode, run in runs.items():
+                best = min(self._time(run) for _ in range(options['repeat']))
+                tracemalloc.start()
+                found = run()
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                self.stdout.write(
+                    f'{path.name:<28}{len(content) / 1024:7.0f}  {mode:<8}'
+                    f'{best * 1000:9.1f}{peak / 1024:10.0f}{len(found):7}'
+                )
+
+    @staticmethod
+    def _time(run):
+        start = time.perf_counter()
+        run()
+        return time.perf_counter() - start
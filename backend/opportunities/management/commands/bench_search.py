@@ -0,0 +1,110 @@
+import itertools
+import random
+import time
+from functools import reduce
+from operator import and_, or_
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+
+from config.search import full_text_search, supports_full_text
+from opportunities.models import Opportunity
+
+
+WORDS = (
+    'research fellowship internship scholarship grant conference competition summer graduate undergraduate '
+    'neuroscience biology chemistry physics mathematics economics policy history engineering software data '
+    'machine learning climate energy health medicine public global leadership innovation design lab program '
+    'students faculty funding award stipend application deadline mentorship project team community impact '
+    'analysis theory systems quantum robotics genomics ecology urban law ethics language literature art'
+).split()
+UNIVERSITIES = ['Harvard University', 'Yale University', 'Princeton University', 'Columbia University',
+                'Brown University', 'Cornell University', 'Dartmouth College', 'University of Pennsylvania']
+DOMAINS = [choice for choice, _ in Opportunity.DOMAIN_CHOICES]
+SYLLABLES = ['ka', 'lo', 'mi', 'ren', 'sor', 'tu', 'vel', 'dra', 'fin', 'gos', 'hul', 'pra', 'qui', 'ste', 'zor']
+SEARCH_FIELDS = ['title', 'description', 'university', 'domain']
+
+
+class _Rollback(Exception):
+    pass
+
+
+def vocabulary(size=20_000):
+    """Domain words first, then made-up words, for a Zipf-like frequency by position."""
+    made_up = (''.join(parts) for n in (2, 3, 4) for parts in itertools.product(SYLLABLES, repeat=n))
+    return (WORDS + list(made_up))[:size]
+
+
+def icontains_search(queryset, query):
+    """What DRF's SearchFilter runs: every term must be a substring of some field."""
+    terms = query.split()
+    return queryset.filter(reduce(and_, (
+        reduce(or_, (Q(**{f'{field}__icontains': term}) for field in SEARCH_FIELDS)) for term in terms
+    )))
+
+
+class Command(BaseCommand):
+    help = ('Benchmark full-text search against icontains scans over a seeded corpus. '
+            'The corpus is created in a transaction that is rolled back.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100_000)
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if not supports_full_text():
+            raise CommandError('The configured database has no full-text search backend.')
+        try:
+            with transaction.atomic():
+                self._run(options['rows'], options['repeat'], random.Random(options['seed']))
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _run(self, rows, repeat, rng):
+        vocab = vocabulary()
+        weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(vocab))))
+
+        def text(k):
+            return ' '.join(rng.choices(vocab, cum_weights=weights, k=k))
+
+        start = time.perf_counter()
+        for offset in range(0, rows, 5000):
+            Opportunity.objects.bulk_create(
+                Opportunity(
+                    title=text(6).title(),
+                    description=text(60),
+                    university=rng.choice(UNIVERSITIES),
+                    domain=rng.choice(DOMAINS),
+                    url=f'https://bench.invalid/{offset + i}',
+                )
+                for i in range(min(5000, rows - offset))
+            )
+        self.stdout.write(f'seeded {rows} opportunities (indexed by triggers) in {time.perf_counter() - start:.1f}s')
+
+        queries = ['research', 'quantum robotics', 'yale', vocab[200], vocab[2000],
+                   f'{vocab[300]} {vocab[3000]}', vocab[5000][:5]]
+        queryset = Opportunity.objects.all()
+        self.stdout.write(f'{"query":<32}{"icontains":>12}{"full-text":>12}{"speedup":>9}{"hits":>16}')
+        for query in queries:
+            scan = icontains_search(queryset, query).order_by('-created_at')
+            ranked = full_text_search(queryset, query).order_by('search_rank', '-id')
+            scan_time, scan_hits = self._time(scan, repeat)
+            fts_time, fts_hits = self._time(ranked, repeat)
+            self.stdout.write(
+                f'{query:<32}{scan_time * 1000:10.1f}ms{fts_time * 1000:10.1f}ms'
+                f'{scan_time / fts_time:8.1f}x{scan_hits:8}/{fts_hits:<7}'
+            )
+
+    @staticmethod
+    def _time(queryset, repeat):
+        """Best time for what a search page costs: the COUNT plus the first 20 rows."""
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            hits = queryset.count()
+            list(queryset[:20])
+            best = min(best, time.perf_counter() - start)
+        return best, hits
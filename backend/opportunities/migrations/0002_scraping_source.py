@@ -0,0 +1,59 @@
+# Generated by Django 4.2.30 on 2026-10-18 07:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("opportunities", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ScrapingSource",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("source_url", models.URLField(max_length=1000, unique=True)),
+                ("etag", models.CharField(blank=True, max_length=500)),
+                ("last_modified", models.CharField(blank=True, max_length=100)),
+                ("content_hash", models.CharField(blank=True, max_length=64)),
+                ("last_scraped_at", models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="scrapingjob",
+            name="skip_reason",
+            field=models.CharField(
+                blank=True,
+                choices=[
+                    ("not_modified", "Not Modified (304)"),
+                    ("unchanged", "Content Unchanged"),
+                ],
+                max_length=20,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="scrapingjob",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("pending", "Pending"),
+                    ("running", "Running"),
+                    ("completed", "Completed"),
+                    ("failed", "Failed"),
+                    ("skipped", "Skipped"),
+                ],
+                default="pending",
+                max_length=20,
+            ),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-18 07:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("opportunities", "0002_scraping_source"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="scrapingjob",
+            name="opportunities_inserted",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="scrapingjob",
+            name="opportunities_skipped",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="scrapingjob",
+            name="opportunities_updated",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name="opportunity",
+            name="url",
+            field=models.URLField(db_index=True, max_length=1000),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.30 on 2026-10-18 07:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("opportunities", "0003_opportunity_url_index_job_counts"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="opportunity",
+            index=models.Index(
+                fields=["created_at", "id"], name="opportuniti_created_dcb96a_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,115 @@
+# Full-text index for opportunities, kept in sync by triggers (see config/search.py)
+
+from django.db import migrations
+
+SQLITE_FORWARDS = [
+    """
+    CREATE VIRTUAL TABLE opportunities_opportunity_search USING fts5(
+        title, description, university, domain,
+        tokenize = 'porter unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    """,
+    # Title matches count most, then university and domain
+    """
+    INSERT INTO opportunities_opportunity_search(opportunities_opportunity_search, rank)
+    VALUES ('rank', 'bm25(10.0, 1.0, 4.0, 2.0)')
+    """,
+    """
+    INSERT INTO opportunities_opportunity_search(rowid, title, description, university, domain)
+    SELECT id, title, description, university, domain FROM opportunities_opportunity
+    """,
+    """
+    CREATE TRIGGER opportunities_opportunity_search_insert
+    AFTER INSERT ON opportunities_opportunity BEGIN
+        INSERT INTO opportunities_opportunity_search(rowid, title, description, university, domain)
+        VALUES (new.id, new.title, new.description, new.university, new.domain);
+    END
+    """,
+    """
+    CREATE TRIGGER opportunities_opportunity_search_update
+    AFTER UPDATE OF title, description, university, domain ON opportunities_opportunity BEGIN
+        UPDATE opportunities_opportunity_search
+        SET title = new.title, description = new.description,
+            university = new.university, domain = new.domain
+        WHERE rowid = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER opportunities_opportunity_search_delete
+    AFTER DELETE ON opportunities_opportunity BEGIN
+        DELETE FROM opportunities_opportunity_search WHERE rowid = old.id;
+    END
+    """,
+]
+
+SQLITE_BACKWARDS = [
+    "DROP TRIGGER opportunities_opportunity_search_insert",
+    "DROP TRIGGER opportunities_opportunity_search_update",
+    "DROP TRIGGER opportunities_opportunity_search_delete",
+    "DROP TABLE opportunities_opportunity_search",
+]
+
+POSTGRES_DOCUMENT = """
+    setweight(to_tsvector('english', coalesce({row}.title, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce({row}.university, '')), 'B') ||
+    setweight(to_tsvector('english', coalesce({row}.domain, '')), 'C') ||
+    setweight(to_tsvector('english', coalesce({row}.description, '')), 'D')
+"""
+
+POSTGRES_FORWARDS = [
+    """
+    CREATE TABLE opportunities_opportunity_search (
+        id bigint PRIMARY KEY REFERENCES opportunities_opportunity (id) ON DELETE CASCADE,
+        document tsvector NOT NULL
+    )
+    """,
+    "CREATE INDEX opportunities_opportunity_search_gin ON opportunities_opportunity_search USING GIN (document)",
+    f"""
+    INSERT INTO opportunities_opportunity_search (id, document)
+    SELECT o.id, {POSTGRES_DOCUMENT.format(row='o')} FROM opportunities_opportunity o
+    """,
+    f"""
+    CREATE FUNCTION opportunities_opportunity_search_sync() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO opportunities_opportunity_search (id, document)
+        VALUES (NEW.id, {POSTGRES_DOCUMENT.format(row='NEW')})
+        ON CONFLICT (id) DO UPDATE SET document = EXCLUDED.document;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER opportunities_opportunity_search_sync
+    AFTER INSERT OR UPDATE OF title, description, university, domain ON opportunities_opportunity
+    FOR EACH ROW EXECUTE FUNCTION opportunities_opportunity_search_sync()
+    """,
+]
+
+POSTGRES_BACKWARDS = [
+    "DROP TRIGGER opportunities_opportunity_search_sync ON opportunities_opportunity",
+    "DROP FUNCTION opportunities_opportunity_search_sync()",
+    "DROP TABLE opportunities_opportunity_search",
+]
+
+
+def run(statements):
+    def operation(apps, schema_editor):
+        for sql in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql, params=None)
+
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("opportunities", "0004_keyset_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run({"sqlite": SQLITE_FORWARDS, "postgresql": POSTGRES_FORWARDS}),
+            run({"sqlite": SQLITE_BACKWARDS, "postgresql": POSTGRES_BACKWARDS}),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.30 on 2026-10-18 08:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("opportunities", "0005_opportunity_search"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="scrapingjob",
+            name="skip_reason",
+            field=models.CharField(
+                blank=True,
+                choices=[
+                    ("not_modified", "Not Modified (304)"),
+                    ("unchanged", "Content Unchanged"),
+                    ("duplicate", "Duplicate URL in Batch"),
+                ],
+                max_length=20,
+            ),
+        ),
+    ]
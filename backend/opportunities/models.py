@@ -24,7 +24,7 @@ class Opportunity(models.Model):
     university = models.CharField(max_length=200)
     domain = models.CharField(max_length=50, choices=DOMAIN_CHOICES, default='other')
     deadline = models.DateField(null=True, blank=True)
-    url = models.URLField(max_length=1000)
+    url = models.URLField(max_length=1000, db_index=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='open')
     tags = models.JSONField(default=list)
     requirements = models.TextField(blank=True)
@@ -36,6 +36,7 @@ class Opportunity(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [models.Index(fields=['created_at', 'id'])]  # keyset pagination
 
     def __str__(self):
         return f"{self.title} - {self.university}"
@@ -47,15 +48,45 @@ class ScrapingJob(models.Model):
         ('running', 'Running'),
         ('completed', 'Completed'),
         ('failed', 'Failed'),
+        ('skipped', 'Skipped'),
+    ]
+    SKIP_REASONS = [
+        ('not_modified', 'Not Modified (304)'),
+        ('unchanged', 'Content Unchanged'),
+        ('duplicate', 'Duplicate URL in Batch'),
     ]
     source_url = models.URLField(max_length=1000)
     university = models.CharField(max_length=200)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     opportunities_found = models.IntegerField(default=0)
+    opportunities_inserted = models.IntegerField(default=0)
+    opportunities_updated = models.IntegerField(default=0)
+    opportunities_skipped = models.IntegerField(default=0)
     error_message = models.TextField(blank=True)
+    skip_reason = models.CharField(max_length=20, choices=SKIP_REASONS, blank=True)
     started_at = models.DateTimeField(null=True, blank=True)
     completed_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return f"{self.university} - {self.status}"
+
+
+class ScrapingSource(models.Model):
+    """HTTP validators and body hash from the last successful scrape of a URL."""
+    source_url = models.URLField(max_length=1000, unique=True)
+    etag = models.CharField(max_length=500, blank=True)
+    last_modified = models.CharField(max_length=100, blank=True)
+    content_hash = models.CharField(max_length=64, blank=True)
+    last_scraped_at = models.DateTimeField(null=True, blank=True)
+
+    def conditional_headers(self):
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+    def __str__(self):
+        return self.source_url
@@ -0,0 +1,158 @@
+import hashlib
+import threading
+from collections import defaultdict, deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .extraction import soup_candidates, stream_candidates
+
+
+DEFAULT_HEADERS = {'User-Agent': 'Mozilla/5.0 (compatible; IvyLeagueBot/1.0)'}
+CHUNK_SIZE = 64 * 1024
+
+# Result of fetching and parsing one page; candidates is empty for a 304.
+Page = namedtuple('Page', ['status_code', 'etag', 'last_modified', 'content_hash', 'candidates'])
+
+
+def build_session(pool_connections=10, pool_maxsize=10):
+    """requests.Session with a keep-alive connection pool shared by all workers."""
+    session = requests.Session()
+    session.headers.update(DEFAULT_HEADERS)
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def fetch_page(session, url, headers=None, timeout=30, streaming=True, known_hash=None):
+    """
+    Download `url` and extract opportunity candidates from it.
+
+    In streaming mode the body is hashed and parsed chunk by chunk as it
+    arrives, so the full page is never held in memory; otherwise the whole
+    body is loaded and parsed with BeautifulSoup. Given the `known_hash` of
+    the last scrape, the body is hashed before it is parsed and a page that
+    hashes the same is returned without candidates, unparsed.
+    """
+    with session.get(url, headers=headers, timeout=timeout, stream=True) as response:
+        response.raise_for_status()
+        etag = response.headers.get('ETag', '')
+        last_modified = response.headers.get('Last-Modified', '')
+        if response.status_code == 304:
+            return Page(304, etag, last_modified, '', [])
+
+        hasher = hashlib.sha256()
+        body = response.iter_content(CHUNK_SIZE)
+        # Only trust an explicit charset; otherwise let the parser sniff it.
+        encoding = response.encoding if 'charset' in response.headers.get('Content-Type', '') else None
+
+        def hashed():
+            for chunk in body:
+                hasher.update(chunk)
+                yield chunk
+
+        if known_hash:
+            content = b''.join(hashed())
+            if hasher.hexdigest() == known_hash:
+                return Page(response.status_code, etag, last_modified, known_hash, [])
+            if streaming:
+                candidates = stream_candidates([content], url, encoding=encoding)
+            else:
+                candidates = soup_candidates(content, url)
+        elif streaming:
+            candidates = stream_candidates(hashed(), url, encoding=encoding)
+            for chunk in body:
+                # Extraction may stop early; the rest still counts towards the hash.
+                hasher.update(chunk)
+        else:
+            candidates = soup_candidates(b''.join(hashed()), url)
+        return Page(response.status_code, etag, last_modified, hasher.hexdigest(), candidates)
+
+
+class HostLimiter:
+    """Caps the number of in-flight requests per host."""
+
+    def __init__(self, per_host):
+        self.per_host = per_host
+        self._lock = threading.Lock()
+        self._semaphores = {}
+
+    def _semaphore(self, host):
+        with self._lock:
+            if host not in self._semaphores:
+                self._semaphores[host] = threading.BoundedSemaphore(self.per_host)
+            return self._semaphores[host]
+
+    def acquire(self, url):
+        sem = self._semaphore(urlsplit(url).netloc.lower())
+        sem.acquire()
+        return sem
+
+
+def interleave_by_host(items, key):
+    """Round-robin items across hosts so one busy host doesn't hog the pool."""
+    buckets = defaultdict(deque)
+    for item in items:
+        buckets[urlsplit(key(item)).netloc.lower()].append(item)
+    ordered = []
+    while buckets:
+        for host in list(buckets):
+            ordered.append(buckets[host].popleft())
+            if not buckets[host]:
+                del buckets[host]
+    return ordered
+
+
+class BatchScraper:
+    """
+    Fetches many URLs concurrently on a bounded thread pool.
+    Download and extraction happen on the workers; parsed pages are yielded
+    back to the calling thread as each one finishes, so DB work stays
+    single-threaded.
+    """
+
+    def __init__(self, max_workers=16, per_host=4, timeout=30, streaming=True, session=None):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.streaming = streaming
+        self.limiter = HostLimiter(per_host)
+        self.session = session or build_session(pool_connections=max_workers, pool_maxsize=max_workers)
+
+    def fetch(self, url, headers=None, known_hash=None):
+        sem = self.limiter.acquire(url)
+        try:
+            return fetch_page(self.session, url, headers, self.timeout, self.streaming, known_hash)
+        finally:
+            sem.release()
+
+    def fetch_all(self, items, key, headers=None, known_hashes=None):
+        """
+        Yield (item, page, error) for every item, in completion order.
+        `headers` and `known_hashes`, if given, map a URL to extra request
+        headers for it and to the content hash of its last scrape.
+        """
+        ordered = interleave_by_host(items, key)
+        if not ordered:
+            return
+        workers = min(self.max_workers, len(ordered))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='scraper') as pool:
+            futures = {
+                pool.submit(
+                    self.fetch, key(item),
+                    headers(key(item)) if headers else None,
+                    known_hashes(key(item)) if known_hashes else None,
+                ): item
+                for item in ordered
+            }
+            for future in as_completed(futures):
+                item = futures[future]
+                try:
+                    yield item, future.result(), None
+                except Exception as e:
+                    yield item, None, e
+
+    def close(self):
+        self.session.close()
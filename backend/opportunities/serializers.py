@@ -13,4 +13,5 @@ class ScrapingJobSerializer(serializers.ModelSerializer):
     class Meta:
         model = ScrapingJob
         fields = '__all__'
-        read_only_fields = ['status', 'opportunities_found', 'started_at', 'completed_at']
+        read_only_fields = ['status', 'skip_reason', 'opportunities_found', 'opportunities_inserted',
+                            'opportunities_updated', 'opportunities_skipped', 'started_at', 'completed_at']
@@ -0,0 +1,28 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from .models import Opportunity
+from .stats import STATS_FIELDS, invalidate_opportunity_stats
+
+
+# Sent after bulk ingestion commits, since bulk_create/bulk_update skip
+# post_save. Receivers get `ids`: the opportunities inserted or updated.
+opportunities_changed = Signal()
+
+
+@receiver(post_save, sender=Opportunity)
+def opportunity_saved(sender, update_fields=None, **kwargs):
+    # views_count bumps don't move any of the stats
+    if update_fields is None or STATS_FIELDS & set(update_fields):
+        transaction.on_commit(invalidate_opportunity_stats)
+
+
+@receiver(post_delete, sender=Opportunity)
+def opportunity_deleted(sender, **kwargs):
+    transaction.on_commit(invalidate_opportunity_stats)
+
+
+@receiver(opportunities_changed, sender=Opportunity)
+def opportunities_ingested(sender, **kwargs):
+    invalidate_opportunity_stats()
@@ -0,0 +1,67 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Case, CharField, Count, Value, When
+from django.utils import timezone
+
+from config import cache_generations
+from .models import Opportunity
+
+
+# Opportunity fields the stats are grouped by; saves touching none of them don't invalidate
+STATS_FIELDS = {'domain', 'university', 'status', 'deadline'}
+DEADLINE_BUCKETS = ['past', 'this_week', 'this_month', 'later', 'none']
+
+
+def _deadline_bucket(today):
+    return Case(
+        When(deadline__isnull=True, then=Value('none')),
+        When(deadline__lt=today, then=Value('past')),
+        When(deadline__lte=today + timedelta(days=7), then=Value('this_week')),
+        When(deadline__lte=today + timedelta(days=30), then=Value('this_month')),
+        default=Value('later'),
+        output_field=CharField(),
+    )
+
+
+def compute_opportunity_stats(today=None):
+    """
+    Totals by domain, university, status and deadline bucket, folded from a
+    single GROUP BY over all four.
+    """
+    today = today or timezone.localdate()
+    rows = (
+        Opportunity.objects.order_by()
+        .annotate(deadline_bucket=_deadline_bucket(today))
+        .values_list('domain', 'university', 'status', 'deadline_bucket')
+        .annotate(n=Count('id'))
+    )
+    stats = {
+        'total': 0,
+        'by_domain': dict.fromkeys((d for d, _ in Opportunity.DOMAIN_CHOICES), 0),
+        'by_university': {},
+        'by_status': dict.fromkeys((s for s, _ in Opportunity.STATUS_CHOICES), 0),
+        'by_deadline': dict.fromkeys(DEADLINE_BUCKETS, 0),
+    }
+    for domain, university, status, bucket, n in rows:
+        stats['total'] += n
+        for key, value in (('by_domain', domain), ('by_university', university),
+                           ('by_status', status), ('by_deadline', bucket)):
+            stats[key][value] = stats[key].get(value, 0) + n
+    stats['by_university'] = dict(sorted(stats['by_university'].items(), key=lambda kv: (-kv[1], kv[0])))
+    return stats
+
+
+STATS_NAMESPACE = 'opportunities:stats'
+
+
+def get_opportunity_stats():
+    # Keyed by date, because deadline buckets move on at midnight
+    return cache_generations.get_or_set(
+        STATS_NAMESPACE, timezone.localdate().isoformat(), compute_opportunity_stats,
+        timeout=settings.STATS_CACHE_SECONDS,
+    )
+
+
+def invalidate_opportunity_stats():
+    cache_generations.invalidate(STATS_NAMESPACE)
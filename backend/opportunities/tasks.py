@@ -1,98 +1,187 @@
 from celery import shared_task
+from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
-import requests
-from bs4 import BeautifulSoup
-import re
-
-
-DOMAIN_KEYWORDS = {
-    'research': ['research', 'laboratory', 'lab', 'study', 'experiment', 'investigation'],
-    'fellowship': ['fellowship', 'fellow', 'award', 'honor'],
-    'internship': ['internship', 'intern', 'training', 'placement'],
-    'scholarship': ['scholarship', 'grant', 'financial aid', 'funding', 'stipend'],
-    'conference': ['conference', 'symposium', 'workshop', 'seminar'],
-    'competition': ['competition', 'contest', 'challenge', 'hackathon'],
-    'grant': ['grant', 'funding', 'support', 'award'],
-}
-
-
-def classify_domain(text):
-    """NLP-lite domain classifier using keyword scoring."""
-    text_lower = text.lower()
-    scores = {domain: 0 for domain in DOMAIN_KEYWORDS}
-    for domain, keywords in DOMAIN_KEYWORDS.items():
-        for kw in keywords:
-            if kw in text_lower:
-                scores[domain] += 1
-    best = max(scores, key=scores.get)
-    return best if scores[best] > 0 else 'other'
+
+from .classifier import DOMAIN_KEYWORDS, classify_domain, classify_domains  # noqa: F401 (re-exported)
+from .deadlines import extract_deadlines
+from .ingest import ingest_candidates
+from .scraper import BatchScraper, build_session, fetch_page
+
+
+def _store_candidates(job, candidates):
+    """Classify a page's candidates and upsert them."""
+    domains = classify_domains([c['title'] + ' ' + c['description'] for c in candidates])
+    deadlines = extract_deadlines([c['description'] for c in candidates])
+    for candidate, domain, deadline in zip(candidates, domains, deadlines):
+        candidate['domain'] = domain
+        candidate['deadline'] = deadline
+
+    counts = ingest_candidates(candidates, job.university)
+    counts['found'] = len(candidates)
+    return counts
+
+
+def _process_page(job, page, source):
+    """
+    Store a fetched page unless it is unchanged since the last scrape of the
+    same URL, in which case the job is marked skipped. Returns the job status.
+    """
+    from opportunities.models import ScrapingSource
+
+    if page.status_code == 304:
+        with transaction.atomic():
+            if source is not None:
+                source.last_scraped_at = timezone.now()
+                source.save(update_fields=['last_scraped_at'])
+            _skip_job(job, 'not_modified')
+        return 'skipped'
+
+    if source is None:
+        source = ScrapingSource(source_url=job.source_url)
+    source.etag = page.etag
+    source.last_modified = page.last_modified
+    source.last_scraped_at = timezone.now()
+
+    # The job and its source are saved together so a crash can't leave a
+    # completed job whose source still has the old hash, or the reverse
+    with transaction.atomic():
+        if source.pk and source.content_hash == page.content_hash:
+            source.save()
+            _skip_job(job, 'unchanged')
+            return 'skipped'
+
+        counts = _store_candidates(job, page.candidates)
+        source.content_hash = page.content_hash
+        source.save()
+        _complete_job(job, counts)
+    return 'completed'
+
+
+def _skip_job(job, reason):
+    job.status = 'skipped'
+    job.skip_reason = reason
+    job.completed_at = timezone.now()
+    job.save()
+
+
+def _complete_job(job, counts):
+    job.status = 'completed'
+    job.opportunities_found = counts['found']
+    job.opportunities_inserted = counts['inserted']
+    job.opportunities_updated = counts['updated']
+    job.opportunities_skipped = counts['skipped']
+    job.completed_at = timezone.now()
+    job.save()
+
+
+def _fail_job(job_id, error):
+    from opportunities.models import ScrapingJob
+    ScrapingJob.objects.filter(id=job_id).update(
+        status='failed',
+        error_message=str(error),
+        completed_at=timezone.now()
+    )
 
 
 @shared_task
 def scrape_opportunities_task(job_id):
-    from opportunities.models import ScrapingJob, Opportunity
+    from opportunities.models import ScrapingJob, ScrapingSource
     try:
         job = ScrapingJob.objects.get(id=job_id)
         job.status = 'running'
         job.started_at = timezone.now()
         job.save()
 
-        headers = {'User-Agent': 'Mozilla/5.0 (compatible; IvyLeagueBot/1.0)'}
-        response = requests.get(job.source_url, headers=headers, timeout=30)
-        response.raise_for_status()
-
-        soup = BeautifulSoup(response.content, 'html.parser')
-        count = 0
-
-        # Generic opportunity extraction heuristic
-        for article in soup.find_all(['article', 'div', 'li'], limit=50):
-            title_el = article.find(['h1', 'h2', 'h3', 'a'])
-            if not title_el or len(title_el.get_text(strip=True)) < 10:
-                continue
-            title = title_el.get_text(strip=True)[:500]
-            desc = article.get_text(strip=True)[:1000]
-            link = title_el.get('href', job.source_url)
-            if link and not link.startswith('http'):
-                from urllib.parse import urljoin
-                link = urljoin(job.source_url, link)
-
-            domain = classify_domain(title + ' ' + desc)
-
-            # Deadline extraction
-            deadline = None
-            date_match = re.search(r'\b(\w+ \d{1,2},? \d{4})\b', desc)
-            if date_match:
-                from dateutil import parser as dateparser
-                try:
-                    deadline = dateparser.parse(date_match.group(1)).date()
-                except Exception:
-                    pass
-
-            Opportunity.objects.get_or_create(
-                url=link,
-                defaults={
-                    'title': title,
-                    'description': desc,
-                    'university': job.university,
-                    'domain': domain,
-                    'deadline': deadline,
-                }
+        source = ScrapingSource.objects.filter(source_url=job.source_url).first()
+        with build_session() as session:
+            page = fetch_page(
+                session, job.source_url,
+                headers=source.conditional_headers() if source else None,
+                timeout=settings.SCRAPER_TIMEOUT,
+                streaming=settings.SCRAPER_STREAMING,
+                known_hash=source.content_hash if source else None,
             )
-            count += 1
 
-        job.status = 'completed'
-        job.opportunities_found = count
-        job.completed_at = timezone.now()
-        job.save()
+        _process_page(job, page, source)
 
     except Exception as e:
         if job_id:
-            from opportunities.models import ScrapingJob
-            ScrapingJob.objects.filter(id=job_id).update(
-                status='failed',
-                error_message=str(e),
-                completed_at=timezone.now()
-            )
+            _fail_job(job_id, e)
+
+
+def scrape_jobs(jobs, scraper=None):
+    """
+    Fetch a batch of ScrapingJobs concurrently and process each page as soon
+    as its download finishes. Returns a {job_id: status} mapping.
+    """
+    from opportunities.models import ScrapingJob, ScrapingSource
+
+    jobs = list(jobs)
+    if not jobs:
+        return {}
+
+    # One fetch per URL: later jobs for a URL already in the batch are skipped
+    # rather than racing the first to create its ScrapingSource
+    unique, duplicates = {}, []
+    for job in jobs:
+        if job.source_url in unique:
+            duplicates.append(job)
+        else:
+            unique[job.source_url] = job
+    jobs = list(unique.values())
+    results = {}
+    for job in duplicates:
+        _skip_job(job, 'duplicate')
+        results[job.id] = 'skipped'
+
+    ScrapingJob.objects.filter(id__in=[j.id for j in jobs]).update(
+        status='running', started_at=timezone.now()
+    )
+    sources = {
+        s.source_url: s
+        for s in ScrapingSource.objects.filter(source_url__in={j.source_url for j in jobs})
+    }
+
+    def conditional_headers(url):
+        source = sources.get(url)
+        return source.conditional_headers() if source else None
+
+    def known_hash(url):
+        source = sources.get(url)
+        return source.content_hash if source else None
+
+    owns_scraper = scraper is None
+    if owns_scraper:
+        scraper = BatchScraper(
+            max_workers=settings.SCRAPER_MAX_WORKERS,
+            per_host=settings.SCRAPER_PER_HOST_LIMIT,
+            timeout=settings.SCRAPER_TIMEOUT,
+            streaming=settings.SCRAPER_STREAMING,
+        )
+
+    try:
+        fetched = scraper.fetch_all(
+            jobs, key=lambda j: j.source_url, headers=conditional_headers, known_hashes=known_hash
+        )
+        for job, page, error in fetched:
+            try:
+                if error is not None:
+                    raise error
+                results[job.id] = _process_page(job, page, sources.get(job.source_url))
+            except Exception as e:
+                _fail_job(job.id, e)
+                results[job.id] = 'failed'
+    finally:
+        if owns_scraper:
+            scraper.close()
+    return results
+
+
+@shared_task
+def scrape_opportunities_batch_task(job_ids):
+    from opportunities.models import ScrapingJob
+    return scrape_jobs(ScrapingJob.objects.filter(id__in=job_ids))
 
 
 @shared_task
@@ -1,3 +1,405 @@
-from django.test import TestCase
+import threading
+from collections import Counter
+from copy import copy
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest import mock
+from urllib.parse import urljoin
 
-# Create your tests here.
+from bs4 import BeautifulSoup
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from config.view_counts import ViewCounter
+from .models import Opportunity, ScrapingJob, ScrapingSource
+from .deadlines import extract_deadline, extract_deadlines
+from .extraction import soup_candidates, stream_candidates
+from .classifier import KeywordMatcher, classify_domain, classify_domains
+from .ingest import ingest_candidates
+from .management.commands.bench_classifier import classify_domain_substring
+from .scraper import BatchScraper
+from . import stats
+from .stats import get_opportunity_stats
+from .tasks import scrape_jobs
+
+
+PAGE = b"""<html><body>
+<article><h2><a href="/programs/reu">Summer Research Experience for Undergraduates</a></h2>
+<p>Paid research placement in campus laboratories.</p></article>
+</body></html>"""
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        if self.path.startswith('/missing'):
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        etag = '"v1"' if self.path.startswith('/etag') else None
+        if etag and self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        if etag:
+            self.send_header('ETag', etag)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(PAGE)))
+        self.end_headers()
+        self.wfile.write(PAGE)
+
+    def log_message(self, *args):
+        pass
+
+
+class BatchScrapingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+        cls.base_url = f'http://127.0.0.1:{cls.server.server_port}'
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def test_batch_updates_every_job(self):
+        ok = [ScrapingJob.objects.create(source_url=f'{self.base_url}/page/{i}', university='Yale University')
+              for i in range(5)]
+        bad = ScrapingJob.objects.create(source_url=f'{self.base_url}/missing', university='Yale University')
+
+        scraper = BatchScraper(max_workers=4, per_host=2, timeout=5)
+        results = scrape_jobs(ok + [bad], scraper=scraper)
+        scraper.close()
+
+        self.assertEqual(results[bad.id], 'failed')
+        for job in ok:
+            job.refresh_from_db()
+            self.assertEqual(job.status, 'completed')
+            self.assertEqual(results[job.id], 'completed')
+        bad.refresh_from_db()
+        self.assertEqual(bad.status, 'failed')
+        self.assertTrue(Opportunity.objects.filter(title__startswith='Summer Research').exists())
+
+    def _rescrape(self, path):
+        job = ScrapingJob.objects.create(source_url=f'{self.base_url}{path}', university='Yale University')
+        scraper = BatchScraper(max_workers=1, per_host=1, timeout=5)
+        scrape_jobs([job], scraper=scraper)
+        scraper.close()
+        job.refresh_from_db()
+        return job
+
+    def test_repeat_scrape_with_etag_is_not_modified(self):
+        self.assertEqual(self._rescrape('/etag/page').status, 'completed')
+        self.assertEqual(ScrapingSource.objects.get(source_url=f'{self.base_url}/etag/page').etag, '"v1"')
+        source = ScrapingSource.objects.get(source_url=f'{self.base_url}/etag/page')
+        ScrapingSource.objects.filter(pk=source.pk).update(last_scraped_at=None)
+        job = self._rescrape('/etag/page')
+        self.assertEqual(job.status, 'skipped')
+        self.assertEqual(job.skip_reason, 'not_modified')
+        source.refresh_from_db()
+        self.assertIsNotNone(source.last_scraped_at)
+
+    def test_duplicate_urls_in_a_batch_are_fetched_once(self):
+        url = f'{self.base_url}/page/dup'
+        first, second = (ScrapingJob.objects.create(source_url=url, university='Yale University') for _ in range(2))
+        scraper = BatchScraper(max_workers=2, per_host=2, timeout=5)
+        results = scrape_jobs([first, second], scraper=scraper)
+        scraper.close()
+        self.assertEqual(results, {first.id: 'completed', second.id: 'skipped'})
+        second.refresh_from_db()
+        self.assertEqual(second.skip_reason, 'duplicate')
+        self.assertEqual(ScrapingSource.objects.filter(source_url=url).count(), 1)
+
+    def test_repeat_scrape_with_same_body_is_unchanged(self):
+        self.assertEqual(self._rescrape('/plain').status, 'completed')
+        with mock.patch('opportunities.scraper.stream_candidates') as parse:
+            job = self._rescrape('/plain')
+        parse.assert_not_called()
+        self.assertEqual(job.status, 'skipped')
+        self.assertEqual(job.skip_reason, 'unchanged')
+
+        ScrapingSource.objects.filter(source_url=f'{self.base_url}/plain').update(content_hash='stale')
+        self.assertEqual(self._rescrape('/plain').status, 'completed')
+
+
+class TriggerScrapingTests(TestCase):
+    def test_urls_must_be_a_list_of_strings(self):
+        admin = User.objects.create_user(email='admin@example.edu', username='admin', password='x' * 12,
+                                         is_staff=True)
+        client = APIClient()
+        client.force_authenticate(admin)
+        for urls in ['https://a.edu/programs', ['https://a.edu/programs', 3], {'url': 'https://a.edu'}, ['']]:
+            response = client.post('/api/opportunities/scrape/', {'urls': urls}, format='json')
+            self.assertEqual(response.status_code, 400, urls)
+        self.assertFalse(ScrapingJob.objects.exists())
+
+
+class ExtractionTests(TestCase):
+    FIXTURES = Path(__file__).resolve().parent / 'fixtures' / 'pages'
+
+    @staticmethod
+    def chunks(content, size=4096):
+        return (content[i:i + size] for i in range(0, len(content), size))
+
+    @staticmethod
+    def soup_titles(content, url):
+        """(url, title) per distinct title element that soup_candidates() would extract, unlimited."""
+        found = {}
+        for container in BeautifulSoup(content, 'html.parser').find_all(['article', 'div', 'li']):
+            title = container.find(['h1', 'h2', 'h3', 'a'])
+            if title is not None and id(title) not in found and len(title.get_text(strip=True)) >= 10:
+                found[id(title)] = (urljoin(url, title.get('href', url)), title.get_text(strip=True))
+        return Counter(found.values())
+
+    def test_fixture_pages_yield_each_soup_title_once(self):
+        for path in sorted(self.FIXTURES.glob('*.html')):
+            content, url = path.read_bytes(), f'https://example.edu/{path.name}'
+            streamed = stream_candidates(self.chunks(content), url, limit=10_000)
+            self.assertEqual(Counter((c['url'], c['title']) for c in streamed), self.soup_titles(content, url),
+                             path.name)
+            # Soup repeats titles for enclosing containers; the stream never does
+            soup_titles = {(c['url'], c['title']) for c in soup_candidates(content, url, limit=None)}
+            self.assertEqual(soup_titles, {(c['url'], c['title']) for c in streamed}, path.name)
+
+    def test_innermost_container_emits_and_limit_counts_candidates(self):
+        content = b"""<html><body>
+        <main>""" + b'<div>no title here</div>' * 60 + b"""
+          <section><article><h2><a href="/a">Summer Research Fellowship</a></h2><p>Paid placement</p></article></section>
+          <li><a href="https://other.edu/b">Graduate Scholarship Program</a> for fellows</li>
+          <script><div><h2>Not Real Opportunity Title</h2></div></script>
+        </main></body></html>"""
+        streamed = stream_candidates(self.chunks(content, 64), 'https://example.edu/list')
+        self.assertEqual(streamed, [
+            # The title is the h2, which has no href of its own
+            {'url': 'https://example.edu/list', 'title': 'Summer Research Fellowship',
+             'description': 'Summer Research FellowshipPaid placement'},
+            {'url': 'https://other.edu/b', 'title': 'Graduate Scholarship Program',
+             'description': 'Graduate Scholarship Programfor fellows'},
+        ])
+        # The soup path gives up after its first 50 containers
+        self.assertEqual(soup_candidates(content, 'https://example.edu/list'), [])
+        self.assertEqual(len(stream_candidates([content], 'https://example.edu/list', limit=1)), 1)
+
+
+class DeadlineTests(TestCase):
+    def test_extract_deadline(self):
+        for text, expected in [
+            ('Applications due 2026-03-01.', date(2026, 3, 1)),
+            ('Deadline: March 1, 2026', date(2026, 3, 1)),
+            ('Apply by Mar. 1st 2026', date(2026, 3, 1)),
+            ('Closes 1 March 2026', date(2026, 3, 1)),
+            # Ranges close on their end date
+            ('Open March 1 - 15, 2026', date(2026, 3, 15)),
+            ('Open March 1 to April 15, 2026', date(2026, 4, 15)),
+            ('Open 1-15 March 2026', date(2026, 3, 15)),
+            ('Open 1 March – 15 April 2026', date(2026, 4, 15)),
+            ('Open Dec 15 - Jan 10, 2027', date(2027, 1, 10)),
+            ('Open Jan 15, 2026 through Feb 1, 2026.', date(2026, 2, 1)),
+            ('Open 15 January 2026 until 1 February 2026', date(2026, 2, 1)),
+            ('Open 2026-01-15 to 2026-02-01', date(2026, 2, 1)),
+            # Separate dates are not a range: the first one wins
+            ('Opens Jan 15, 2026. Closes Feb 1, 2026.', date(2026, 1, 15)),
+            # Relative phrases and dates without a year aren't deadlines we can place
+            ('Applications reviewed on a rolling basis', None),
+            ('Due within 30 days of posting', None),
+            ('Deadline next Friday', None),
+            ('Deadline March 1', None),
+            # Unparseable or impossible
+            ('Founded in 2026 by alumni', None),
+            ('Deadline February 30, 2026', None),
+            ('Deadline 2026-13-01', None),
+            ('', None),
+        ]:
+            self.assertEqual(extract_deadline(text), expected, text)
+
+    def test_extract_deadlines_keeps_order(self):
+        texts = ['Due March 1, 2026', 'No deadline', 'Due 2 April 2026']
+        self.assertEqual(extract_deadlines(texts), [date(2026, 3, 1), None, date(2026, 4, 2)])
+
+
+class ClassifierTests(TestCase):
+    def test_keywords_match_whole_words_plurals_and_phrases(self):
+        matcher = KeywordMatcher({'lab': ['lab'], 'aid': ['financial aid'], 'intern': ['internship', 'intern']})
+        for text, expected in [
+            ('Join our lab', [1, 0, 0]),
+            ('Two labs, (lab) and LAB.', [1, 0, 0]),
+            ('Lab-based work, supported', [1, 0, 0]),
+            ('Label the samples', [0, 0, 0]),
+            ('Collaborate', [0, 0, 0]),
+            ('Apply for financial aid today', [0, 1, 0]),
+            ('Financial aids are listed', [0, 1, 0]),
+            ('financial aide position', [0, 0, 0]),
+            ('Financial\naid', [0, 0, 0]),
+            ('Summer internship', [0, 0, 2]),  # 'intern' counts inside the 'internship' keyword
+            ('International students', [0, 0, 0]),
+        ]:
+            self.assertEqual(matcher.scores(text), expected, text)
+
+    def test_classification_matches_the_substring_scan_except_false_positives(self):
+        unchanged = [
+            'Summer Research Fellowship in neuroscience',
+            'Software engineering internship with stipend',
+            'Merit scholarship and financial aid for undergraduates',
+            'Annual robotics hackathon and design challenge',
+            'Graduate symposium on climate policy',
+            'Travel grant supporting conference attendance',
+            'Undergraduate research assistant, biology laboratory',
+            'Campus newsletter',
+        ]
+        self.assertEqual(classify_domains(unchanged), [classify_domain_substring(t) for t in unchanged])
+
+        # Keywords hidden inside unrelated words no longer tip the balance
+        fixed = [
+            ('Label design workshop', 'research', 'conference'),
+            ('International hackathon', 'internship', 'competition'),
+            ('Honorable mention: coding contest', 'fellowship', 'competition'),
+        ]
+        for text, before, after in fixed:
+            self.assertEqual((classify_domain_substring(text), classify_domain(text)), (before, after), text)
+
+
+class IngestCandidatesTests(TestCase):
+    def candidate(self, url, title='Undergraduate Research Fellowship'):
+        return {'url': url, 'title': title, 'description': '', 'domain': 'research', 'deadline': None}
+
+    def test_counts_inserted_updated_and_skipped(self):
+        Opportunity.objects.create(url='https://a.edu/1', title='Old title', university='Brown University')
+        Opportunity.objects.create(url='https://a.edu/2', title='Undergraduate Research Fellowship',
+                                   university='Brown University')
+        counts = ingest_candidates([
+            self.candidate('https://a.edu/1'),
+            self.candidate('https://a.edu/2'),
+            self.candidate('https://a.edu/3'),
+            self.candidate('https://a.edu/3'),
+        ], 'Brown University')
+        self.assertEqual(counts, {'inserted': 1, 'updated': 1, 'skipped': 2})
+        self.assertEqual(Opportunity.objects.get(url='https://a.edu/1').title, 'Undergraduate Research Fellowship')
+        self.assertEqual(Opportunity.objects.filter(url='https://a.edu/3').count(), 1)
+
+
+class FullTextSearchTests(TestCase):
+    def setUp(self):
+        for title, description, university in [
+            ('Summer Research Fellowship', 'Neuroscience lab placement', 'Yale University'),
+            ('Software Engineering Internship', 'Work with the research computing team', 'MIT'),
+            ('Graduate Scholarship', 'Merit award for fellows', 'Harvard University'),
+        ]:
+            Opportunity.objects.create(title=title, description=description, university=university,
+                                       url='https://example.edu/')
+
+    def search(self, query):
+        return [o['title'] for o in APIClient().get('/api/opportunities/', {'search': query}).data['results']]
+
+    def test_ranks_title_matches_first_and_matches_prefixes(self):
+        self.assertEqual(self.search('research'),
+                         ['Summer Research Fellowship', 'Software Engineering Internship'])
+        self.assertEqual(self.search('fellow'), ['Summer Research Fellowship', 'Graduate Scholarship'])
+        self.assertEqual(self.search('yale neuro'), ['Summer Research Fellowship'])
+        self.assertEqual(self.search('"";*'), self.search(''))
+
+    def test_index_follows_updates_and_deletes(self):
+        opportunity = Opportunity.objects.get(university='MIT')
+        opportunity.title = 'Quantum Computing Internship'
+        opportunity.save()
+        self.assertEqual(self.search('quantum'), ['Quantum Computing Internship'])
+        opportunity.delete()
+        self.assertEqual(self.search('quantum'), [])
+
+
+# Counts database queries for the stats themselves, not the cache backend's
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class OpportunityStatsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        today = timezone.localdate()
+        for domain, university, status, deadline in [
+            ('research', 'Yale University', 'open', today + timedelta(days=3)),
+            ('research', 'Yale University', 'open', today + timedelta(days=20)),
+            ('internship', 'MIT', 'closed', today - timedelta(days=1)),
+            ('internship', 'Yale University', 'upcoming', None),
+        ]:
+            Opportunity.objects.create(title='Opportunity', url='https://example.edu/', domain=domain,
+                                       university=university, status=status, deadline=deadline)
+
+    def test_breakdowns_come_from_one_query_and_are_cached(self):
+        with self.assertNumQueries(1):
+            stats = get_opportunity_stats()
+        self.assertEqual(stats['total'], 4)
+        self.assertEqual(stats['by_domain']['research'], 2)
+        self.assertEqual(stats['by_domain']['grant'], 0)
+        self.assertEqual(stats['by_university'], {'Yale University': 3, 'MIT': 1})
+        self.assertEqual(stats['by_status'], {'open': 2, 'closed': 1, 'upcoming': 1})
+        self.assertEqual(stats['by_deadline'],
+                         {'past': 1, 'this_week': 1, 'this_month': 1, 'later': 0, 'none': 1})
+        with self.assertNumQueries(0):
+            get_opportunity_stats()
+
+    def test_writes_invalidate_except_view_count_bumps(self):
+        get_opportunity_stats()
+        opportunity = Opportunity.objects.filter(domain='research').first()
+        opportunity.views_count += 1
+        with self.captureOnCommitCallbacks(execute=True):
+            opportunity.save(update_fields=['views_count'])
+        self.assertEqual(get_opportunity_stats()['by_domain']['research'], 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            opportunity.delete()
+        self.assertEqual(get_opportunity_stats()['by_domain']['research'], 1)
+
+    def test_stats_computed_before_a_write_are_not_kept_after_it(self):
+        compute = stats.compute_opportunity_stats
+
+        def compute_then_write():
+            result = compute()
+            with self.captureOnCommitCallbacks(execute=True):
+                Opportunity.objects.create(title='Opportunity', url='https://example.edu/', university='MIT')
+            return result
+
+        with mock.patch.object(stats, 'compute_opportunity_stats', compute_then_write):
+            self.assertEqual(get_opportunity_stats()['total'], 4)
+        self.assertEqual(get_opportunity_stats()['total'], 5)
+
+
+@override_settings(VIEW_COUNT_FLUSH_SECONDS=3600, VIEW_COUNT_MAX_STALENESS=0)
+class ViewCounterTests(TestCase):
+    def setUp(self):
+        self.counter = ViewCounter()
+        self.addCleanup(self.counter.flush)
+        self.a, self.b, self.c = (
+            Opportunity.objects.create(title='Opportunity', university='MIT', url='https://example.edu/')
+            for _ in range(3)
+        )
+
+    def test_views_are_buffered_and_flushed_as_batched_increments(self):
+        with self.assertNumQueries(0):
+            for opportunity in [self.a, self.a, self.b, self.c]:
+                self.counter.increment(copy(opportunity))  # as loaded by each request
+        viewed = copy(self.a)
+        self.counter.increment(viewed)
+        self.assertEqual(viewed.views_count, 3)  # buffered views show up in the response
+        self.assertEqual(self.counter.pending(), 5)
+
+        Opportunity.objects.filter(pk=self.a.pk).update(views_count=10)  # a concurrent writer
+        with self.assertNumQueries(4):  # savepoint, +3 for a, +1 for b and c, release
+            self.assertEqual(self.counter.flush(), 5)
+        counts = dict(Opportunity.objects.values_list('pk', 'views_count'))
+        self.assertEqual([counts[o.pk] for o in (self.a, self.b, self.c)], [13, 1, 1])
+        self.assertEqual(self.counter.flush(), 0)
+
+    @override_settings(VIEW_COUNT_FLUSH_SECONDS=0)
+    def test_zero_interval_writes_through(self):
+        self.counter.increment(self.a)
+        self.assertEqual(self.counter.pending(), 0)
+        self.a.refresh_from_db()
+        self.assertEqual(self.a.views_count, 1)
@@ -1,15 +1,21 @@
 from rest_framework import generics, permissions, filters
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
+
+from config.pagination import KeysetPagination
+from config.search import FullTextSearchFilter
+from config.view_counts import view_counter
 from .models import Opportunity, ScrapingJob
 from .serializers import OpportunitySerializer, ScrapingJobSerializer
-from .tasks import scrape_opportunities_task
+from .stats import get_opportunity_stats
+from .tasks import scrape_opportunities_task, scrape_opportunities_batch_task
 
 
 class OpportunityListCreateView(generics.ListCreateAPIView):
     serializer_class = OpportunitySerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    pagination_class = KeysetPagination
+    filter_backends = [filters.OrderingFilter, FullTextSearchFilter]
     search_fields = ['title', 'description', 'university', 'domain']
     ordering_fields = ['deadline', 'created_at', 'views_count']
     ordering = ['-created_at']
@@ -35,8 +41,7 @@ class OpportunityDetailView(generics.RetrieveUpdateDestroyAPIView):
 
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
-        instance.views_count += 1
-        instance.save(update_fields=['views_count'])
+        view_counter.increment(instance)
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
 
@@ -45,7 +50,17 @@ class OpportunityDetailView(generics.RetrieveUpdateDestroyAPIView):
 @permission_classes([permissions.IsAdminUser])
 def trigger_scraping(request):
     url = request.data.get('url')
+    urls = request.data.get('urls')
     university = request.data.get('university', 'Unknown')
+    if urls is not None and not (isinstance(urls, list) and all(isinstance(u, str) and u for u in urls)):
+        return Response({'error': 'urls must be a list of URLs'}, status=400)
+    if urls:
+        jobs = ScrapingJob.objects.bulk_create(
+            [ScrapingJob(source_url=u, university=university) for u in urls]
+        )
+        job_ids = [job.id for job in jobs]
+        scrape_opportunities_batch_task.delay(job_ids)
+        return Response({'message': 'Batch scraping started', 'job_ids': job_ids})
     if not url:
         return Response({'error': 'URL required'}, status=400)
     job = ScrapingJob.objects.create(source_url=url, university=university)
@@ -56,8 +71,4 @@ def trigger_scraping(request):
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def opportunity_stats(request):
-    total = Opportunity.objects.count()
-    by_domain = {}
-    for d, _ in Opportunity.DOMAIN_CHOICES:
-        by_domain[d] = Opportunity.objects.filter(domain=d).count()
-    return Response({'total': total, 'by_domain': by_domain})
+    return Response(get_opportunity_stats())
@@ -0,0 +1,237 @@
+import re
+import threading
+from collections import defaultdict
+
+import numpy as np
+from scipy import sparse
+from django.db.models import Count, Max
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from opportunities.models import Opportunity
+
+
+TOP_N = 20
+
+# Bonus for domain match
+DOMAIN_BONUS_KEYWORDS = {
+    'research': ['research', 'lab', 'science'],
+    'fellowship': ['leadership', 'policy', 'global'],
+    'internship': ['engineering', 'software', 'business'],
+    'scholarship': ['academic', 'gpa', 'merit'],
+}
+DOMAIN_BONUS = 0.5
+
+
+def opportunity_text(title, description, domain, tags):
+    return f"{title} {description} {domain} {' '.join(tags or [])}"
+
+
+def user_keywords(profile):
+    return profile_keywords(profile.interests, profile.skills)
+
+
+def profile_keywords(interests, skills):
+    interests = [str(i).lower() for i in (interests or [])]
+    skills = [str(s).lower() for s in (skills or [])]
+    return interests, interests + skills
+
+
+# Same tokenization as TfidfVectorizer's default token_pattern
+_TERM_RE = re.compile(r'(?u)\b\w\w+\b')
+
+
+def terms(text):
+    return set(_TERM_RE.findall(text.lower()))
+
+
+class OpportunityIndex:
+    """
+    TF-IDF matrix over the text of every open opportunity.
+
+    Rows are L2-normalized, so scoring a user is a single sparse
+    matrix-vector product against the sum of their keyword vectors.
+    """
+
+    def __init__(self, version, ids, domains, vectorizer, matrix):
+        self.version = version
+        self.ids = ids
+        self.domains = domains
+        self.vectorizer = vectorizer
+        self.matrix = matrix
+        self.positions = {opp_id: pos for pos, opp_id in enumerate(ids.tolist())}
+        # (bonus domains x opportunities) indicator, so bonuses for many users are one product
+        self.domain_indicator = np.array(
+            [self.domains == domain for domain in DOMAIN_BONUS_KEYWORDS], dtype=np.float32
+        ).reshape(len(DOMAIN_BONUS_KEYWORDS), len(ids))
+
+    @classmethod
+    def build(cls, version):
+        rows = list(
+            Opportunity.objects.filter(status='open')
+            .order_by('id')
+            .values_list('id', 'title', 'description', 'domain', 'tags')
+        )
+        ids = np.array([r[0] for r in rows], dtype=np.int64)
+        domains = np.array([r[3] for r in rows], dtype=object)
+        if not rows:
+            return cls(version, ids, domains, None, None)
+        vectorizer = TfidfVectorizer(
+            ngram_range=(1, 2), sublinear_tf=True, stop_words='english', dtype=np.float32
+        )
+        try:
+            matrix = vectorizer.fit_transform(opportunity_text(*r[1:]) for r in rows).tocsr()
+        except ValueError:  # every document was empty or stop words
+            return cls(version, ids, domains, None, None)
+        return cls(version, ids, domains, vectorizer, matrix)
+
+    def query_vectors(self, keyword_lists):
+        """One row per keyword list: the sum of that list's keyword vectors."""
+        rows = []
+        for keywords in keyword_lists:
+            if keywords:
+                rows.append(sparse.csr_matrix(self.vectorizer.transform(keywords).sum(axis=0)))
+            else:
+                rows.append(sparse.csr_matrix((1, self.matrix.shape[1]), dtype=np.float32))
+        return sparse.vstack(rows, format='csr')
+
+    def domain_bonus(self, keyword_lists, positions=None):
+        """(users x opportunities) domain-match bonus, optionally for some columns only."""
+        hits = np.array([
+            [sum(1 for kw in domain_keywords if kw in keywords) for domain_keywords in DOMAIN_BONUS_KEYWORDS.values()]
+            for keywords in map(set, keyword_lists)
+        ], dtype=np.float32).reshape(len(keyword_lists), len(DOMAIN_BONUS_KEYWORDS))
+        indicator = self.domain_indicator if positions is None else self.domain_indicator[:, positions]
+        return DOMAIN_BONUS * (hits @ indicator)
+
+    def score_many(self, keyword_lists, exclude=None):
+        """
+        (users x opportunities) scores for a chunk of users in one sparse
+        matrix-matrix product. `exclude` is an iterable of (row, opportunity_id)
+        pairs whose score is set to -inf.
+        """
+        shape = (len(keyword_lists), len(self.ids))
+        if self.matrix is None:
+            return np.zeros(shape, dtype=np.float32)
+        scores = (self.query_vectors(keyword_lists) @ self.matrix.T).toarray()
+        scores += self.domain_bonus(keyword_lists)
+        for row, opp_id in exclude or ():
+            pos = self.positions.get(opp_id)
+            if pos is not None:
+                scores[row, pos] = -np.inf
+        return scores
+
+    def score_columns(self, keyword_lists, positions):
+        """(users x len(positions)) scores against just the given opportunities."""
+        if self.matrix is None or not positions:
+            return np.zeros((len(keyword_lists), len(positions)), dtype=np.float32)
+        scores = (self.query_vectors(keyword_lists) @ self.matrix[positions].T).toarray()
+        return scores + self.domain_bonus(keyword_lists, positions)
+
+    def score(self, keywords, exclude_ids=()):
+        """Scores for every indexed opportunity; excluded ones get -inf."""
+        return self.score_many([keywords], [(0, opp_id) for opp_id in exclude_ids])[0]
+
+
+class KeywordUserIndex:
+    """
+    Inverted index from keyword terms to the users whose interests or skills
+    contain them, used to find the only users a new or edited opportunity
+    can score for. Users whose keywords earn a domain bonus are indexed by
+    domain as well.
+    """
+
+    def __init__(self, version):
+        self.version = version
+        self.keywords = {}
+        self.interests = {}
+        self.by_term = defaultdict(set)
+        self.by_domain = defaultdict(set)
+
+    @classmethod
+    def build(cls, version):
+        from accounts.models import StudentProfile
+
+        index = cls(version)
+        for user_id, interests, skills in StudentProfile.objects.values_list('user_id', 'interests', 'skills'):
+            index.add(user_id, *profile_keywords(interests, skills))
+        return index
+
+    def add(self, user_id, interests, keywords):
+        if not keywords:
+            return
+        self.interests[user_id] = interests
+        self.keywords[user_id] = keywords
+        for kw in keywords:
+            for term in terms(kw):
+                self.by_term[term].add(user_id)
+        for domain, domain_keywords in DOMAIN_BONUS_KEYWORDS.items():
+            if any(kw in domain_keywords for kw in keywords):
+                self.by_domain[domain].add(user_id)
+
+    def candidates(self, text, domain):
+        """Ids of users that could get a non-zero score for this opportunity."""
+        users = set(self.by_domain.get(domain, ()))
+        for term in terms(text):
+            users |= self.by_term.get(term, set())
+        return users
+
+
+def top_n(scores, n=TOP_N):
+    """Positions of the n best positive scores, best first, via argpartition."""
+    candidates = np.flatnonzero(scores > 0)
+    if len(candidates) > n:
+        part = np.argpartition(-scores[candidates], n - 1)[:n]
+        candidates = candidates[part]
+    return candidates[np.argsort(-scores[candidates], kind='stable')]
+
+
+_index = None
+_lock = threading.Lock()
+
+
+def _current_version():
+    agg = Opportunity.objects.filter(status='open').aggregate(n=Count('id'), latest=Max('updated_at'))
+    return agg['n'], agg['latest']
+
+
+def _profiles_version():
+    from accounts.models import StudentProfile
+
+    agg = StudentProfile.objects.aggregate(n=Count('id'), latest=Max('updated_at'))
+    return agg['n'], agg['latest']
+
+
+def get_index():
+    """
+    Shared per-process index, rebuilt only when the set of open
+    opportunities has changed (checked with one aggregate query).
+    """
+    global _index
+    version = _current_version()
+    if _index is not None and _index.version == version:
+        return _index
+    with _lock:
+        if _index is None or _index.version != version:
+            _index = OpportunityIndex.build(version)
+        return _index
+
+
+_user_index = None
+
+
+def get_user_index():
+    """Shared keyword -> users index, rebuilt when any profile has changed."""
+    global _user_index
+    version = _profiles_version()
+    if _user_index is not None and _user_index.version == version:
+        return _user_index
+    with _lock:
+        if _user_index is None or _user_index.version != version:
+            _user_index = KeywordUserIndex.build(version)
+        return _user_index
+
+
+def invalidate_index():
+    global _index, _user_index
+    _index = None
+    _user_index = None
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from recommendations.tasks import refresh_all_recommendations
+
+
+class Command(BaseCommand):
+    help = 'Recompute recommendations for every student (or a user id range) in chunked batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start-id', type=int, help='First user id to process (resume point).')
+        parser.add_argument('--end-id', type=int, help='Last user id to process.')
+        parser.add_argument('--chunk-size', type=int, default=500, help='Users scored per matrix product.')
+
+    def handle(self, *args, **options):
+        def progress(done, last_id, rate):
+            self.stdout.write(f'{done} users, last user id {last_id}, {rate:.0f} users/sec')
+
+        result = refresh_all_recommendations(
+            options['start_id'], options['end_id'], options['chunk_size'], progress=progress
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Refreshed {result['users']} users in {result['seconds']:.1f}s "
+            f"({result['users_per_sec']:.0f} users/sec)"
+        ))
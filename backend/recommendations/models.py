@@ -17,3 +17,25 @@ class Recommendation(models.Model):
 
     def __str__(self):
         return f"{self.user.email} → {self.opportunity.title[:40]} ({self.score:.2f})"
+
+
+class PendingRefresh(models.Model):
+    """
+    A user or opportunity whose recommendations are out of date. Saves
+    record one of these instead of queueing a task each, and
+    refresh_pending_recommendations() handles them together on a beat schedule.
+    """
+    KIND_CHOICES = [
+        ('user', 'User'),
+        ('opportunity', 'Opportunity'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ['kind', 'object_id']
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id}"
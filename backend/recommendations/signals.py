@@ -0,0 +1,48 @@
+from django.db.models.signals import post_init, post_save
+from django.dispatch import receiver
+
+from accounts.models import StudentProfile
+from opportunities.models import Opportunity
+from opportunities.signals import opportunities_changed
+from .tasks import mark_stale
+
+
+# Saves touching only other fields (e.g. views_count) don't affect scores
+OPPORTUNITY_SCORED_FIELDS = {'title', 'description', 'domain', 'tags', 'status'}
+PROFILE_SCORED_FIELDS = {'interests', 'skills'}
+
+
+@receiver(post_save, sender=Opportunity)
+def opportunity_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not OPPORTUNITY_SCORED_FIELDS & set(update_fields):
+        return
+    mark_stale('opportunity', [instance.id])
+
+
+@receiver(opportunities_changed)
+def opportunities_ingested(sender, ids, **kwargs):
+    mark_stale('opportunity', ids)
+
+
+def _keywords(profile):
+    return profile.__dict__.get('interests'), profile.__dict__.get('skills')
+
+
+@receiver(post_init, sender=StudentProfile)
+def remember_profile_keywords(sender, instance, **kwargs):
+    instance._scored_keywords = _keywords(instance)
+
+
+@receiver(post_save, sender=StudentProfile)
+def profile_saved(sender, instance, created=False, update_fields=None, **kwargs):
+    if update_fields is not None and not PROFILE_SCORED_FIELDS & set(update_fields):
+        return
+    keywords = _keywords(instance)
+    if created:
+        unchanged = not any(keywords)  # a new profile without keywords has nothing to match
+    else:
+        unchanged = keywords == instance._scored_keywords
+    if unchanged:
+        return
+    instance._scored_keywords = keywords
+    mark_stale('user', [instance.user_id])
@@ -0,0 +1,256 @@
+import time
+from collections import defaultdict
+
+from celery import shared_task
+from django.db import transaction
+
+from .engine import TOP_N, get_index, get_user_index, opportunity_text, profile_keywords, top_n
+
+
+BATCH_SIZE = 1000
+
+
+def recommendation_rows(index, user_id, interests, scores):
+    """Unsaved Recommendation objects for one user's top-scoring opportunities."""
+    from recommendations.models import Recommendation
+
+    rows = []
+    for pos in top_n(scores):
+        rows.append(Recommendation(
+            user_id=user_id,
+            opportunity_id=int(index.ids[pos]),
+            score=float(scores[pos]),
+            reason=_reason(interests, index.domains[pos]),
+        ))
+    return rows
+
+
+def save_recommendations(rows):
+    """
+    Upsert recommendations in batches, keeping is_viewed and created_at.
+    Rows for opportunities deleted since they were scored are dropped, so a
+    deletion during a long refresh doesn't abort it on the foreign key.
+    Returns the rows saved.
+    """
+    from opportunities.models import Opportunity
+    from recommendations.models import Recommendation
+
+    saved = []
+    for start in range(0, len(rows), BATCH_SIZE):
+        batch = rows[start:start + BATCH_SIZE]
+        ids = {r.opportunity_id for r in batch}
+        existing = set(Opportunity.objects.filter(id__in=ids).values_list('id', flat=True))
+        batch = [r for r in batch if r.opportunity_id in existing]
+        Recommendation.objects.bulk_create(
+            batch,
+            update_conflicts=True,
+            unique_fields=['user', 'opportunity'],
+            update_fields=['score', 'reason'],
+        )
+        saved += batch
+    return saved
+
+
+def _reason(interests, domain):
+    return f"Matches your interests in {', '.join(interests[:3]) or domain}"
+
+
+def refresh_user_recommendations(user_id, interests, keywords):
+    """
+    Rescore one user against every open opportunity. Their top rows are
+    upserted and rows that fell out of the top set are deleted.
+    """
+    from applications.models import Application
+    from recommendations.models import Recommendation
+
+    index = get_index()
+    applied = Application.objects.filter(user_id=user_id).values_list('opportunity_id', flat=True)
+    scores = index.score(keywords, exclude_ids=set(applied))
+    rows = save_recommendations(recommendation_rows(index, user_id, interests, scores))
+    Recommendation.objects.filter(user_id=user_id).exclude(
+        opportunity_id__in=[r.opportunity_id for r in rows]
+    ).delete()
+    return rows
+
+
+def refresh_for_opportunities(opportunity_ids):
+    """
+    Patch existing recommendations after some opportunities were created or
+    edited. Only users the inverted keyword index says could match them, or
+    who already have them recommended, are scored, and only against these
+    opportunities. Each user's top-N set is then merged in place.
+    """
+    from applications.models import Application
+    from opportunities.models import Opportunity
+    from recommendations.models import Recommendation
+
+    index = get_index()
+    user_index = get_user_index()
+    opportunity_ids = set(opportunity_ids)
+
+    positions, domains, users = [], [], set()
+    rows = Opportunity.objects.filter(id__in=opportunity_ids, status='open').values_list(
+        'id', 'title', 'description', 'domain', 'tags'
+    )
+    for opp_id, title, description, domain, tags in rows:
+        if opp_id in index.positions:
+            positions.append(index.positions[opp_id])
+            domains.append(domain)
+            users |= user_index.candidates(opportunity_text(title, description, domain, tags), domain)
+    users |= set(Recommendation.objects.filter(opportunity_id__in=opportunity_ids).values_list('user_id', flat=True))
+    if not users:
+        return {'users': 0, 'upserted': 0, 'deleted': 0}
+
+    users = sorted(users)
+    keyword_lists = [user_index.keywords.get(user_id, []) for user_id in users]
+    scores = index.score_columns(keyword_lists, positions)
+    col_ids = [int(index.ids[pos]) for pos in positions]
+    applied = set(Application.objects.filter(user_id__in=users, opportunity_id__in=opportunity_ids)
+                  .values_list('user_id', 'opportunity_id'))
+
+    current = defaultdict(dict)
+    for rec_id, user_id, opp_id, score in Recommendation.objects.filter(user_id__in=users).values_list(
+        'id', 'user_id', 'opportunity_id', 'score'
+    ):
+        current[user_id][opp_id] = (rec_id, score)
+
+    to_save, to_delete = [], []
+    for row, user_id in enumerate(users):
+        existing = current[user_id]
+        merged = {opp_id: score for opp_id, (_, score) in existing.items() if opp_id not in opportunity_ids}
+        for col, opp_id in enumerate(col_ids):
+            score = float(scores[row, col])
+            if score > 0 and (user_id, opp_id) not in applied:
+                merged[opp_id] = score
+        keep = set(sorted(merged, key=merged.get, reverse=True)[:TOP_N])
+
+        to_delete += [rec_id for opp_id, (rec_id, _) in existing.items() if opp_id not in keep]
+        for col, opp_id in enumerate(col_ids):
+            if opp_id in keep and (opp_id not in existing or existing[opp_id][1] != merged[opp_id]):
+                to_save.append(Recommendation(
+                    user_id=user_id,
+                    opportunity_id=opp_id,
+                    score=merged[opp_id],
+                    reason=_reason(user_index.interests.get(user_id, []), domains[col]),
+                ))
+
+    save_recommendations(to_save)
+    Recommendation.objects.filter(id__in=to_delete).delete()
+    return {'users': len(users), 'upserted': len(to_save), 'deleted': len(to_delete)}
+
+
+def refresh_all_recommendations(start_id=None, end_id=None, chunk_size=500, progress=None):
+    """
+    Score every student profile with user id in [start_id, end_id] against all
+    open opportunities, one chunk of users per sparse matrix-matrix product.
+
+    Each user's top rows are upserted and their rows that fell out of the
+    top set (closed, applied to or no longer matching) are deleted.
+
+    Users are walked in id order, so an interrupted run can be resumed by
+    passing the last reported user id + 1 as start_id. `progress`, if given,
+    is called after each chunk with (users_done, last_user_id, users_per_sec).
+    """
+    from accounts.models import StudentProfile
+    from applications.models import Application
+    from recommendations.models import Recommendation
+
+    index = get_index()
+    profiles = StudentProfile.objects.order_by('user_id')
+    if start_id is not None:
+        profiles = profiles.filter(user_id__gte=start_id)
+    if end_id is not None:
+        profiles = profiles.filter(user_id__lte=end_id)
+
+    started = time.monotonic()
+    done = 0
+    last_id = None
+    while True:
+        chunk_qs = profiles if last_id is None else profiles.filter(user_id__gt=last_id)
+        chunk = list(chunk_qs.values_list('user_id', 'interests', 'skills')[:chunk_size])
+        if not chunk:
+            break
+
+        user_ids = [user_id for user_id, _, _ in chunk]
+        interests, keyword_lists = zip(*(profile_keywords(i, s) for _, i, s in chunk))
+        row_of = {user_id: row for row, user_id in enumerate(user_ids)}
+        applied = Application.objects.filter(user_id__in=user_ids).values_list('user_id', 'opportunity_id')
+
+        scores = index.score_many(keyword_lists, [(row_of[u], o) for u, o in applied])
+        rows = []
+        for row, user_id in enumerate(user_ids):
+            rows += recommendation_rows(index, user_id, interests[row], scores[row])
+        kept = {(r.user_id, r.opportunity_id) for r in save_recommendations(rows)}
+        stale = [
+            rec_id for rec_id, user_id, opp_id in Recommendation.objects.filter(user_id__in=user_ids)
+            .values_list('id', 'user_id', 'opportunity_id') if (user_id, opp_id) not in kept
+        ]
+        Recommendation.objects.filter(id__in=stale).delete()
+
+        done += len(chunk)
+        last_id = user_ids[-1]
+        if progress:
+            progress(done, last_id, done / max(time.monotonic() - started, 1e-9))
+
+    elapsed = time.monotonic() - started
+    return {'users': done, 'last_user_id': last_id, 'seconds': elapsed, 'users_per_sec': done / max(elapsed, 1e-9)}
+
+
+@shared_task
+def refresh_all_recommendations_task(start_id=None, end_id=None, chunk_size=500):
+    return refresh_all_recommendations(start_id, end_id, chunk_size)
+
+
+@shared_task
+def refresh_user_recommendations_task(user_id):
+    from accounts.models import StudentProfile
+
+    profile = StudentProfile.objects.filter(user_id=user_id).values_list('interests', 'skills').first()
+    if profile is not None:
+        refresh_user_recommendations(user_id, *profile_keywords(*profile))
+
+
+@shared_task
+def refresh_for_opportunities_task(opportunity_ids):
+    return refresh_for_opportunities(opportunity_ids)
+
+
+def mark_stale(kind, ids):
+    """Record that these users' or opportunities' recommendations need a refresh. One INSERT."""
+    from recommendations.models import PendingRefresh
+
+    PendingRefresh.objects.bulk_create(
+        [PendingRefresh(kind=kind, object_id=object_id) for object_id in set(ids)],
+        ignore_conflicts=True,
+    )
+
+
+def refresh_pending_recommendations():
+    """
+    Handle everything mark_stale() recorded since the last run: every
+    changed opportunity in one refresh_for_opportunities() call, so the
+    index is refitted once however many changed, then each changed
+    profile. Requests are deleted in the same transaction as the refresh,
+    so a failed run leaves them for the next one.
+    """
+    from accounts.models import StudentProfile
+    from recommendations.models import PendingRefresh
+
+    with transaction.atomic():
+        pending = list(PendingRefresh.objects.values_list('id', 'kind', 'object_id'))
+        if not pending:
+            return {'opportunities': 0, 'users': 0}
+        PendingRefresh.objects.filter(id__in=[pk for pk, _, _ in pending]).delete()
+        opportunity_ids = [object_id for _, kind, object_id in pending if kind == 'opportunity']
+        user_ids = [object_id for _, kind, object_id in pending if kind == 'user']
+        if opportunity_ids:
+            refresh_for_opportunities(opportunity_ids)
+        profiles = StudentProfile.objects.filter(user_id__in=user_ids).values_list('user_id', 'interests', 'skills')
+        for user_id, interests, skills in profiles:
+            refresh_user_recommendations(user_id, *profile_keywords(interests, skills))
+    return {'opportunities': len(opportunity_ids), 'users': len(user_ids)}
+
+
+@shared_task
+def refresh_pending_recommendations_task():
+    return refresh_pending_recommendations()
@@ -1,3 +1,145 @@
 from django.test import TestCase
 
-# Create your tests here.
+from accounts.models import StudentProfile, User
+from applications.models import Application
+from opportunities.models import Opportunity
+from .models import PendingRefresh, Recommendation
+from .tasks import refresh_all_recommendations, refresh_for_opportunities, refresh_pending_recommendations
+from .views import generate_recommendations
+
+
+class GenerateRecommendationsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='ada@example.edu', username='ada', password='x' * 12)
+        StudentProfile.objects.create(user=self.user, interests=['machine learning'], skills=['python'])
+        self.ml = Opportunity.objects.create(
+            title='Machine Learning Research Internship', description='Python and deep learning.',
+            university='MIT', domain='research', url='https://mit.edu/ml')
+        self.applied = Opportunity.objects.create(
+            title='Applied Machine Learning Fellowship', description='Python.',
+            university='Yale University', domain='fellowship', url='https://yale.edu/ml')
+        Opportunity.objects.create(
+            title='Medieval History Seminar', description='Archives and manuscripts.',
+            university='Brown University', domain='conference', url='https://brown.edu/hist')
+        Application.objects.create(user=self.user, opportunity=self.applied)
+
+    def test_ranks_matching_open_opportunities(self):
+        recs = generate_recommendations(self.user)
+        self.assertEqual([r.opportunity_id for r in recs], [self.ml.id])
+        self.assertGreater(recs[0].score, 0)
+
+    def test_index_picks_up_new_opportunities(self):
+        generate_recommendations(self.user)
+        extra = Opportunity.objects.create(
+            title='Python Machine Learning Bootcamp', description='', university='Cornell University',
+            domain='internship', url='https://cornell.edu/py')
+        generate_recommendations(self.user)
+        self.assertTrue(Recommendation.objects.filter(user=self.user, opportunity=extra).exists())
+
+
+class RefreshAllRecommendationsTests(TestCase):
+    def test_refreshes_users_in_id_range(self):
+        opp = Opportunity.objects.create(
+            title='Robotics Research Internship', description='Python robotics.',
+            university='Princeton University', domain='research', url='https://princeton.edu/robotics')
+        users = []
+        for i in range(5):
+            user = User.objects.create_user(email=f's{i}@example.edu', username=f's{i}', password='x' * 12)
+            StudentProfile.objects.create(user=user, skills=['robotics'])
+            users.append(user)
+
+        result = refresh_all_recommendations(start_id=users[1].id, end_id=users[3].id, chunk_size=2)
+
+        self.assertEqual(result['users'], 3)
+        self.assertEqual(result['last_user_id'], users[3].id)
+        self.assertEqual(
+            set(Recommendation.objects.filter(opportunity=opp).values_list('user_id', flat=True)),
+            {users[1].id, users[2].id, users[3].id},
+        )
+
+    def test_removes_recommendations_that_dropped_out(self):
+        opp = Opportunity.objects.create(
+            title='Robotics Research Internship', description='Python robotics.',
+            university='Princeton University', domain='research', url='https://princeton.edu/robotics')
+        user = User.objects.create_user(email='s@example.edu', username='s', password='x' * 12)
+        StudentProfile.objects.create(user=user, skills=['robotics'])
+        refresh_all_recommendations()
+        self.assertTrue(Recommendation.objects.filter(user=user, opportunity=opp).exists())
+
+        opp.status = 'closed'
+        opp.save()
+        refresh_all_recommendations()
+        self.assertFalse(Recommendation.objects.filter(user=user, opportunity=opp).exists())
+
+    def test_opportunity_deleted_mid_run_is_skipped(self):
+        kept, deleted = (Opportunity.objects.create(
+            title=f'Robotics Research Internship {i}', description='Python robotics.',
+            university='Princeton University', domain='research', url=f'https://princeton.edu/robotics/{i}')
+            for i in range(2))
+        users = []
+        for i in range(2):
+            user = User.objects.create_user(email=f's{i}@example.edu', username=f's{i}', password='x' * 12)
+            StudentProfile.objects.create(user=user, skills=['robotics'])
+            users.append(user)
+        deleted_id = deleted.id
+
+        # The index was built before the first chunk, so the second still scores the deleted opportunity
+        result = refresh_all_recommendations(chunk_size=1, progress=lambda done, *_: done == 1 and deleted.delete())
+
+        self.assertEqual(result['users'], 2)
+        self.assertFalse(Recommendation.objects.filter(opportunity_id=deleted_id).exists())
+        self.assertTrue(Recommendation.objects.filter(user=users[1], opportunity=kept).exists())
+
+
+class RefreshForOpportunitiesTests(TestCase):
+    def setUp(self):
+        self.match = User.objects.create_user(email='m@example.edu', username='m', password='x' * 12)
+        StudentProfile.objects.create(user=self.match, interests=['neuroscience'])
+        self.other = User.objects.create_user(email='o@example.edu', username='o', password='x' * 12)
+        StudentProfile.objects.create(user=self.other, interests=['architecture'])
+
+    def test_scores_only_matching_users_and_drops_closed(self):
+        opp = Opportunity.objects.create(
+            title='Neuroscience Summer Fellowship', description='Cognitive neuroscience lab.',
+            university='Columbia University', domain='fellowship', url='https://columbia.edu/neuro')
+
+        result = refresh_for_opportunities([opp.id])
+        self.assertEqual(result['users'], 1)
+        self.assertTrue(Recommendation.objects.filter(user=self.match, opportunity=opp).exists())
+        self.assertFalse(Recommendation.objects.filter(user=self.other).exists())
+
+        opp.status = 'closed'
+        opp.save()
+        refresh_for_opportunities([opp.id])
+        self.assertFalse(Recommendation.objects.filter(opportunity=opp).exists())
+
+
+class PendingRefreshTests(TestCase):
+    def test_saves_are_recorded_and_refreshed_together(self):
+        user = User.objects.create_user(email='m@example.edu', username='m', password='x' * 12)
+        profile = StudentProfile.objects.create(user=user, interests=['neuroscience'])
+        opps = [Opportunity.objects.create(
+            title=f'Neuroscience Summer Fellowship {i}', description='Cognitive neuroscience lab.',
+            university='Columbia University', domain='fellowship', url=f'https://columbia.edu/neuro/{i}')
+            for i in range(3)]
+        opps[0].title += ' (updated)'
+        opps[0].save()
+        opps[1].save(update_fields=['views_count'])
+        profile.save()  # keywords unchanged
+        self.assertEqual(
+            sorted(PendingRefresh.objects.values_list('kind', 'object_id')),
+            sorted([('opportunity', opp.id) for opp in opps] + [('user', user.id)]),
+        )
+
+        self.assertEqual(refresh_pending_recommendations(), {'opportunities': 3, 'users': 1})
+        self.assertFalse(PendingRefresh.objects.exists())
+        self.assertEqual(Recommendation.objects.filter(user=user).count(), 3)
+        self.assertEqual(refresh_pending_recommendations(), {'opportunities': 0, 'users': 0})
+
+    def test_profile_without_keyword_changes_is_not_recorded(self):
+        user = User.objects.create_user(email='m@example.edu', username='m', password='x' * 12)
+        profile = StudentProfile.objects.create(user=user)
+        self.assertFalse(PendingRefresh.objects.exists())
+        profile.skills = ['python']
+        profile.save()
+        self.assertEqual(list(PendingRefresh.objects.values_list('kind', 'object_id')), [('user', user.id)])
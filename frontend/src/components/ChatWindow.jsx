@@ -16,7 +16,7 @@ const ChatWindow = ({ roomSlug = 'general' }) => {
         const fetchHistory = async () => {
             try {
                 const res = await api.get(`community/chat/${roomSlug}/history/`);
-                setMessages(res.data.reverse());
+                setMessages((res.data.results || res.data).reverse());
             } catch (err) {
                 console.error('History fetch failed', err);
             }